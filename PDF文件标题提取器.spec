@@ -5,7 +5,7 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('resources', 'resources'), ('resources', 'resources')],
+    datas=[('resources', 'resources')],
     hiddenimports=['tkinter', 'tkinter.ttk', 'windnd'],
     hookspath=[],
     hooksconfig={},
@@ -16,19 +16,18 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
+# 打包为文件夹（onedir）而不是单个文件：单文件版本每次启动都要先把全部依赖解压到临时目录，
+# 文件夹版本直接从安装目录加载，启动明显更快。不使用UPX压缩，避免每次加载时解压DLL
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='PDF文件标题提取器',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -37,3 +36,12 @@ exe = EXE(
     entitlements_file=None,
     icon=['resources\\app_icon.ico'],
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='PDF文件标题提取器',
+)
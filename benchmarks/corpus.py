@@ -0,0 +1,221 @@
+"""
+合成PDF测试语料生成器
+不依赖第三方库，直接写出PDF对象。相同的随机种子总是生成完全相同的文件，
+可用于对比不同版本之间的性能。
+"""
+import os
+import random
+import argparse
+from typing import List, Optional, Tuple
+
+# 拉丁文字与中文字符的素材
+LATIN_WORDS = (
+    "quality manual procedure control document system management review "
+    "specification process safety report annual technical standard operation "
+    "maintenance training policy audit record equipment design testing"
+).split()
+CJK_CHARS = "质量管理手册程序文件控制系统评审规范过程安全报告年度技术标准操作维护培训政策审核记录设备设计测试"
+DOCUMENT_CODES = ("TM", "STR", "TEC", "CSR", "HRM", "MIS", "OM")
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+
+
+class CorpusSpec:
+    """语料参数"""
+
+    def __init__(self, count: int = 200, seed: int = 0,
+                 pages: Tuple[int, int] = (1, 5),
+                 title_sizes: Tuple[float, ...] = (16, 18, 20, 24),
+                 body_sizes: Tuple[float, ...] = (9, 10, 10.5, 12),
+                 body_lines: Tuple[int, int] = (10, 60),
+                 cjk_ratio: float = 0.5,
+                 header_ratio: float = 0.7,
+                 padding_kb: Tuple[int, int] = (0, 64)):
+        self.count = count
+        self.seed = seed
+        self.pages = pages  # 页数范围
+        self.title_sizes = title_sizes  # 标题字号
+        self.body_sizes = body_sizes  # 正文字号
+        self.body_lines = body_lines  # 第一页正文行数范围
+        self.cjk_ratio = cjk_ratio  # 中文标题的比例
+        self.header_ratio = header_ratio  # 带页眉文本的文件比例
+        self.padding_kb = padding_kb  # 附加填充数据的大小范围（KB），用于控制文件大小
+
+
+def _is_cjk(char: str) -> bool:
+    return ord(char) > 0x2E80
+
+
+def _split_runs(text: str) -> List[Tuple[bool, str]]:
+    """将文本拆分为连续的中文/西文片段"""
+    runs = []
+    for char in text:
+        cjk = _is_cjk(char)
+        if runs and runs[-1][0] == cjk:
+            runs[-1] = (cjk, runs[-1][1] + char)
+        else:
+            runs.append((cjk, char))
+    return runs
+
+
+def _escape_latin(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text_ops(text: str, size: float, x: float, y: float) -> str:
+    """生成绘制一行文本的内容流操作符，中文使用CID字体，西文使用Helvetica"""
+    ops = []
+    for cjk, run in _split_runs(text):
+        if cjk:
+            encoded = run.encode("utf-16-be").hex().upper()
+            ops.append(f"BT /F2 {size:g} Tf {x:.2f} {y:.2f} Td <{encoded}> Tj ET")
+            x += size * len(run)
+        else:
+            ops.append(f"BT /F1 {size:g} Tf {x:.2f} {y:.2f} Td ({_escape_latin(run)}) Tj ET")
+            x += size * 0.5 * len(run)
+    return "\n".join(ops)
+
+
+def _random_title(rng: random.Random, cjk: bool) -> str:
+    if cjk:
+        words = ["".join(rng.choice(CJK_CHARS) for _ in range(rng.randint(2, 4)))
+                 for _ in range(rng.randint(2, 4))]
+        title = "".join(words)
+        # 部分中文标题混入英文单词
+        if rng.random() < 0.5:
+            title += " " + " ".join(rng.choice(LATIN_WORDS).capitalize() for _ in range(rng.randint(1, 3)))
+        return title
+    return " ".join(rng.choice(LATIN_WORDS).capitalize() for _ in range(rng.randint(3, 8)))
+
+
+def _body_line(rng: random.Random, cjk_ratio: float) -> str:
+    if rng.random() < cjk_ratio:
+        return "".join(rng.choice(CJK_CHARS) for _ in range(rng.randint(15, 35)))
+    return " ".join(rng.choice(LATIN_WORDS) for _ in range(rng.randint(8, 14)))
+
+
+def build_pdf(rng: random.Random, spec: CorpusSpec) -> Tuple[bytes, str]:
+    """生成一个PDF文件，返回(文件内容, 预期标题)"""
+    cjk_title = rng.random() < spec.cjk_ratio
+    title = _random_title(rng, cjk_title)
+    title_size = rng.choice(spec.title_sizes)
+    page_count = rng.randint(*spec.pages)
+
+    page_streams = []
+    for page_index in range(page_count):
+        ops = []
+        if rng.random() < spec.header_ratio:
+            code = f"{rng.choice(DOCUMENT_CODES)}-{rng.randint(1, 9999):04d}"
+            ops.append(_text_ops(f"{code} Rev.{rng.randint(1, 9)}", 9, 50, PAGE_HEIGHT - 30))
+        y = PAGE_HEIGHT - 120
+        if page_index == 0:
+            # 标题可能折行
+            if len(title) > 20 and rng.random() < 0.3:
+                cut = len(title) // 2
+                ops.append(_text_ops(title[:cut], title_size, 60, y))
+                y -= title_size * 1.4
+                ops.append(_text_ops(title[cut:], title_size, 60, y))
+            else:
+                ops.append(_text_ops(title, title_size, 60, y))
+            y -= title_size * 2
+            if rng.random() < 0.5:
+                ops.append(_text_ops(_random_title(rng, cjk_title), title_size * 0.7, 60, y))
+                y -= title_size * 1.5
+        body_size = rng.choice(spec.body_sizes)
+        for _ in range(rng.randint(*spec.body_lines)):
+            if y < 60:
+                break
+            ops.append(_text_ops(_body_line(rng, spec.cjk_ratio), body_size, 50, y))
+            y -= body_size * 1.5
+        ops.append(_text_ops(str(page_index + 1), 9, PAGE_WIDTH / 2, 30))
+        page_streams.append("\n".join(ops).encode("latin-1"))
+
+    padding = rng.randint(*spec.padding_kb) * 1024
+    return _assemble_pdf(page_streams, title, padding), title
+
+
+def _assemble_pdf(page_streams: List[bytes], title: str, padding: int) -> bytes:
+    """组装PDF对象并写出交叉引用表"""
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # 占位，页面树创建后再填写
+    pages = add(b"")
+    font_latin = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    cid_font = add(b"<< /Type /Font /Subtype /CIDFontType0 /BaseFont /STSong-Light "
+                   b"/CIDSystemInfo << /Registry (Adobe) /Ordering (GB1) /Supplement 4 >> "
+                   b"/DW 1000 >>")
+    font_cjk = add(b"<< /Type /Font /Subtype /Type0 /BaseFont /STSong-Light-UniGB-UCS2-H "
+                   b"/Encoding /UniGB-UCS2-H /DescendantFonts [%d 0 R] >>" % cid_font)
+    resources = b"<< /Font << /F1 %d 0 R /F2 %d 0 R >> >>" % (font_latin, font_cjk)
+
+    page_ids = []
+    for stream in page_streams:
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources %s /Contents %d 0 R >>"
+            % (pages, PAGE_WIDTH, PAGE_HEIGHT, resources, content)))
+    if padding:
+        # 填充数据只用于控制文件大小，不被页面引用
+        filler = bytes(range(256)) * (padding // 256 + 1)
+        filler = filler[:padding]
+        add(b"<< /Length %d >>\nstream\n" % len(filler) + filler + b"\nendstream")
+
+    title_hex = ("FEFF" + title.encode("utf-16-be").hex().upper()).encode("ascii")
+    info = add(b"<< /Title <" + title_hex + b"> /Producer (pdf_auto_renamer benchmark) >>")
+
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += (b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(objects) + 1, catalog, info, xref_offset))
+    return bytes(out)
+
+
+def generate_corpus(output_dir: str, spec: Optional[CorpusSpec] = None) -> List[str]:
+    """在output_dir中生成语料，返回生成的文件路径列表"""
+    spec = spec or CorpusSpec()
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(spec.seed)
+    paths = []
+    for index in range(spec.count):
+        data, _ = build_pdf(rng, spec)
+        path = os.path.join(output_dir, f"doc_{index:06d}.pdf")
+        with open(path, "wb") as f:
+            f.write(data)
+        paths.append(path)
+    return paths
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="生成合成PDF测试语料")
+    parser.add_argument("output_dir", help="输出目录")
+    parser.add_argument("-n", "--count", type=int, default=200, help="文件数量")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--cjk-ratio", type=float, default=0.5, help="中文标题比例")
+    parser.add_argument("--max-pages", type=int, default=5, help="最大页数")
+    parser.add_argument("--max-padding-kb", type=int, default=64, help="最大填充数据大小（KB）")
+    args = parser.parse_args(argv)
+
+    spec = CorpusSpec(count=args.count, seed=args.seed, cjk_ratio=args.cjk_ratio,
+                      pages=(1, args.max_pages), padding_kb=(0, args.max_padding_kb))
+    paths = generate_corpus(args.output_dir, spec)
+    print(f"已生成 {len(paths)} 个文件: {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+性能基准测试
+用法：
+    python benchmarks/run_benchmarks.py [--count 200] [--corpus 目录] [--json 结果文件]
+未指定语料目录时，先在临时目录中生成可复现的合成语料。
+报告每个阶段的吞吐量（文件/秒）、p50/p95/p99延迟以及峰值内存。
+"""
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.pdf_processor import PDFTitleExtractor, has_usable_title
+from core.renamer import DirectoryNameIndex, rename_with_title
+from benchmarks.corpus import CorpusSpec, generate_corpus
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩法计算百分位数，输入须已排序"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb(include_children: bool = False) -> Optional[float]:
+    """当前进程（及已结束子进程）的峰值内存，单位MB"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if include_children:
+        usage = max(usage, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux以KB为单位，macOS以字节为单位
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return usage / divisor
+
+
+def summarize(name: str, latencies: List[float], wall_time: float, count: int,
+              include_children: bool = False) -> Dict:
+    latencies = sorted(latencies)
+    return {
+        "name": name,
+        "files": count,
+        "wall_time": round(wall_time, 4),
+        "files_per_sec": round(count / wall_time, 2) if wall_time > 0 else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "peak_rss_mb": peak_rss_mb(include_children),
+    }
+
+
+def time_each(items: List, func: Callable) -> Tuple[List[float], float]:
+    """逐个计时，返回(每项耗时列表, 总耗时)"""
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t = time.perf_counter()
+        func(item)
+        latencies.append(time.perf_counter() - t)
+    return latencies, time.perf_counter() - start
+
+
+def bench_extract(paths: List[str], backend: str, mode: str, use_metadata: bool = False) -> Dict:
+    extractor = PDFTitleExtractor()
+    extractor.backend = backend
+    extractor.extraction_mode = mode
+    extractor.use_metadata = use_metadata
+    latencies, wall = time_each(paths, extractor.extract_title_candidates)
+    name = f"extract[{backend},{mode}{',metadata' if use_metadata else ''}]"
+    return summarize(name, latencies, wall, len(paths))
+
+
+def filename_items(extractor: PDFTitleExtractor, paths: List[str]) -> List[Tuple[str, str]]:
+    """(标题, 原文件名) 列表，用于测量文件名处理"""
+    return [(extractor.extract_title_candidates(path)[0][0], os.path.basename(path))
+            for path in paths]
+
+
+def bench_process_filename(extractor: PDFTitleExtractor, items: List[Tuple[str, str]]) -> Dict:
+    latencies, wall = time_each(items, lambda item: extractor.process_filename(*item))
+    return summarize("process_filename", latencies, wall, len(items))
+
+
+def bench_process_filenames(extractor: PDFTitleExtractor, items: List[Tuple[str, str]],
+                            chunk_size: int = 200) -> Dict:
+    """批量接口：每次调用处理chunk_size个文件名，延迟为每次调用的耗时"""
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    latencies, wall = time_each(chunks, extractor.process_filenames)
+    return summarize(f"process_filenames[{chunk_size}]", latencies, wall, len(items))
+
+
+def bench_batch_rename(paths: List[str], workers: Optional[int], backend: str) -> Dict:
+    """端到端批量重命名：在临时副本上执行多进程提取和重命名"""
+    work_dir = tempfile.mkdtemp(prefix="pdf_bench_rename_")
+    try:
+        copies = []
+        for path in paths:
+            target = os.path.join(work_dir, os.path.basename(path))
+            shutil.copyfile(path, target)
+            copies.append(target)
+
+        extractor = PDFTitleExtractor()
+        extractor.backend = backend
+        name_index = DirectoryNameIndex()
+        latencies = []
+        start = time.perf_counter()
+        for result in extractor.extract_batch(copies, max_workers=workers):
+            t = time.perf_counter()
+            if has_usable_title(result.candidates):
+                rename_with_title(extractor, result.path, result.candidates[0][0],
+                                  name_index=name_index)
+            latencies.append(result.elapsed + time.perf_counter() - t)
+        wall = time.perf_counter() - start
+        return summarize(f"batch_rename[{backend},workers={workers or os.cpu_count()}]",
+                         latencies, wall, len(copies), include_children=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def print_report(results: List[Dict]):
+    header = f"{'基准':<40}{'文件数':>8}{'文件/秒':>12}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'峰值内存(MB)':>14}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        rss = f"{r['peak_rss_mb']:.1f}" if r['peak_rss_mb'] is not None else "-"
+        print(f"{r['name']:<40}{r['files']:>8}{r['files_per_sec'] or 0:>12.2f}"
+              f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{rss:>14}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="PDF标题提取性能基准测试")
+    parser.add_argument("--corpus", help="已有的PDF语料目录（默认生成合成语料）")
+    parser.add_argument("-n", "--count", type=int, default=200, help="合成语料文件数")
+    parser.add_argument("--seed", type=int, default=0, help="合成语料随机种子")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="批量重命名的工作进程数")
+    parser.add_argument("--json", help="将结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    temp_corpus = None
+    if args.corpus:
+        paths = sorted(
+            os.path.join(root, f)
+            for root, _, files in os.walk(args.corpus)
+            for f in files if f.lower().endswith(".pdf")
+        )
+    else:
+        temp_corpus = tempfile.mkdtemp(prefix="pdf_bench_corpus_")
+        paths = generate_corpus(temp_corpus, CorpusSpec(count=args.count, seed=args.seed))
+
+    try:
+        results = []
+        for backend in ("pdfplumber", "pdfminer"):
+            for mode in ("full", "header"):
+                results.append(bench_extract(paths, backend, mode))
+        # 合成语料的/Title为真实标题，测量元数据快速通道
+        results.append(bench_extract(paths, "pdfminer", "full", use_metadata=True))
+        extractor = PDFTitleExtractor()
+        extractor.backend = "pdfminer"
+        items = filename_items(extractor, paths) * 20
+        results.append(bench_process_filename(extractor, items))
+        results.append(bench_process_filenames(extractor, items))
+        results.append(bench_batch_rename(paths, args.workers, "pdfminer"))
+        print_report(results)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+    finally:
+        if temp_corpus:
+            shutil.rmtree(temp_corpus, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
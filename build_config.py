@@ -13,7 +13,8 @@ def build():
         '--hidden-import=tkinter',  # 添加tkinter
         '--hidden-import=tkinter.ttk',  # 添加tkinter.ttk
         '--hidden-import=windnd',  # 添加windnd库
-        '--onefile',  # 打包成单个文件
+        '--onedir',  # 打包成文件夹：单文件版本每次启动都要先解压全部依赖，文件夹版本启动更快
+        '--noupx',  # 不使用UPX压缩，避免加载DLL时解压
     ]
     
     # Windows特定配置
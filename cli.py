@@ -0,0 +1,497 @@
+"""
+命令行（无界面）模式
+用法：
+    python main.py extract <目录或文件...>   只提取标题候选
+    python main.py rename <目录或文件...>    提取标题并重命名
+    python main.py watch <目录...>           监视目录，自动重命名新写入的PDF文件
+    python main.py undo [--batch 批次]       撤销最近（或指定）一批重命名
+    python main.py duplicates <目录或文件...> 列出内容相同的PDF文件
+    python main.py serve [--port 8765]       启动本地HTTP提取服务
+分片批量处理（多台机器共享存储）：
+    python main.py manifest <目录或文件...> -m 清单   列出全部PDF文件
+    python main.py shard 清单 --index I --count N --results-dir 目录   提取第I个分片
+    python main.py merge 清单 --count N --results-dir 目录 --plan 计划   合并结果，生成重命名计划
+    python main.py apply 计划 [--index I --count N]   按计划重命名
+每处理完一个文件立即输出一行JSON（JSONL），便于下游工具流式读取
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Iterable, Iterator, List, Optional
+
+from core.pdf_processor import PDFTitleExtractor, StageProfile, has_usable_title
+from core.renamer import DirectoryNameIndex, rename_with_title
+
+
+# 命令行模式的子命令，main.py据此判断启动命令行还是图形界面
+COMMANDS = ("extract", "rename", "watch", "undo", "duplicates", "serve",
+            "manifest", "shard", "merge", "apply")
+
+
+def iter_pdf_files(inputs: Iterable[str]) -> Iterator[str]:
+    """遍历输入的文件和目录，返回其中所有PDF文件的绝对路径"""
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            for root, _, files in os.walk(input_path):
+                for file in sorted(files):
+                    if file.lower().endswith('.pdf'):
+                        yield os.path.abspath(os.path.join(root, file))
+        elif input_path.lower().endswith('.pdf') and os.path.isfile(input_path):
+            yield os.path.abspath(input_path)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description="PDF文件标题提取器（命令行模式）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_extractor_arguments(sub):
+        sub.add_argument("-w", "--workers", type=int, default=None,
+                         help="并行工作进程数（默认为CPU核心数）")
+        sub.add_argument("-o", "--output", default="-",
+                         help="JSONL输出文件（默认输出到标准输出）")
+        sub.add_argument("--mode", choices=["full", "header"], default="full",
+                         help="提取模式：full分析整页，header只分析页面顶部区域（更快）")
+        sub.add_argument("--region-ratio", type=float, default=0.4,
+                         help="header模式下分析的页面顶部比例（默认0.4）")
+        sub.add_argument("--backend", choices=["pdfplumber", "pdfminer"], default="pdfplumber",
+                         help="解析后端：pdfminer直接读取字符流，结果相同但速度更快")
+        sub.add_argument("--metadata", action="store_true",
+                         help="文档元数据（XMP、/Title）中的标题可信时直接使用，跳过第一页版面分析")
+        sub.add_argument("--metadata-require-code", action="store_true",
+                         help="只信任标题或原文件名中包含文件编号（如TM-001）的元数据标题")
+        sub.add_argument("--timeout", type=float, default=120.0,
+                         help="单个文件的处理时间上限（秒），超时的文件记为失败，0表示不限制")
+        sub.add_argument("--memory-limit", type=int, default=2048,
+                         help="每个工作进程的内存上限（MB），超出的文件记为失败，0表示不限制")
+        sub.add_argument("--no-cache", action="store_true", help="不使用标题候选缓存")
+        sub.add_argument("--cache-path", default=None, help="缓存数据库路径")
+        sub.set_defaults(cache_by_default=True)
+        
+    def add_common_arguments(sub):
+        sub.add_argument("inputs", nargs="+", help="PDF文件或包含PDF的目录")
+        add_extractor_arguments(sub)
+        sub.add_argument("--profile", action="store_true",
+                         help="输出每个文件各处理阶段的耗时（在单进程中顺序处理）")
+        sub.add_argument("--dedupe", action="store_true",
+                         help="按内容查找重复文件，内容相同的副本只提取一次（输出记录中的duplicate_of为被复用的文件）")
+        add_metrics_arguments(sub)
+
+    def add_metrics_arguments(sub):
+        sub.add_argument("--metrics-json", default=None,
+                         help="定期将吞吐量、耗时分布、失败原因等指标写入该JSON文件")
+        sub.add_argument("--metrics-prom", default=None,
+                         help="定期将指标以Prometheus文本格式写入该文件（供node_exporter textfile收集器读取）")
+        sub.add_argument("--metrics-interval", type=float, default=10.0,
+                         help="指标文件的写入间隔（秒，默认10），结束时再写入一次")
+
+    def add_journal_arguments(sub):
+        sub.add_argument("--journal", default=None,
+                         help="重命名日志文件（默认 ~/.pdf_title_extractor/rename_journal.jsonl）")
+        sub.add_argument("--no-journal", action="store_true", help="不记录重命名日志")
+
+    add_common_arguments(subparsers.add_parser("extract", help="提取标题候选"))
+    rename_parser = subparsers.add_parser("rename", help="提取标题并重命名文件")
+    add_common_arguments(rename_parser)
+    rename_parser.add_argument("--dry-run", action="store_true", help="只输出新文件名，不实际重命名")
+    add_journal_arguments(rename_parser)
+    rename_parser.add_argument("--resume", action="store_true",
+                               help="跳过日志中记录为已重命名完成的文件（中断后继续处理）")
+    
+    watch_parser = subparsers.add_parser("watch", help="监视目录，自动重命名新写入的PDF文件")
+    watch_parser.add_argument("inputs", nargs="+", help="要监视的目录")
+    add_extractor_arguments(watch_parser)
+    watch_parser.add_argument("-r", "--recursive", action="store_true", help="同时监视子目录")
+    watch_parser.add_argument("--settle", type=float, default=2.0,
+                              help="文件大小保持不变多少秒后视为写入完成（默认2秒）")
+    watch_parser.add_argument("--polling", action="store_true",
+                              help="定时扫描目录而不使用inotify（网络共享目录通常需要）")
+    watch_parser.add_argument("--poll-interval", type=float, default=5.0, help="扫描间隔秒数（默认5秒）")
+    watch_parser.add_argument("--queue-size", type=int, default=1000, help="工作队列长度上限")
+    watch_parser.add_argument("--process-existing", action="store_true",
+                              help="启动时先处理目录中已有的PDF文件")
+    watch_parser.add_argument("--dry-run", action="store_true", help="只输出新文件名，不实际重命名")
+    add_journal_arguments(watch_parser)
+    
+    undo_parser = subparsers.add_parser("undo", help="按日志撤销一批重命名")
+    undo_parser.add_argument("--journal", default=None, help="重命名日志文件")
+    undo_parser.add_argument("--batch", default=None, help="要撤销的批次（默认为最近一个未撤销的批次）")
+    undo_parser.add_argument("-o", "--output", default="-", help="JSONL输出文件（默认输出到标准输出）")
+    
+    duplicates_parser = subparsers.add_parser("duplicates", help="列出内容相同的PDF文件")
+    duplicates_parser.add_argument("inputs", nargs="+", help="PDF文件或包含PDF的目录")
+    duplicates_parser.add_argument("-o", "--output", default="-", help="JSONL输出文件（默认输出到标准输出）")
+    
+    serve_parser = subparsers.add_parser("serve", help="启动本地HTTP提取服务（常驻工作进程）")
+    add_extractor_arguments(serve_parser)
+    serve_parser.add_argument("--host", default="127.0.0.1", help="监听地址（默认只接受本机连接）")
+    serve_parser.add_argument("--port", type=int, default=8765, help="监听端口（默认8765）")
+    serve_parser.add_argument("--max-body", type=int, default=200, help="请求体大小上限（MB，默认200）")
+    
+    # 分片批量处理
+    def add_shard_selection(sub, required: bool):
+        sub.add_argument("--index", type=int, required=required, default=0, help="分片编号（从0开始）")
+        sub.add_argument("--count", type=int, required=required, default=1, help="分片总数")
+    
+    manifest_parser = subparsers.add_parser("manifest", help="列出全部PDF文件，写入分片处理的清单")
+    manifest_parser.add_argument("inputs", nargs="+", help="PDF文件或包含PDF的目录")
+    manifest_parser.add_argument("-m", "--manifest", required=True, help="清单文件")
+    manifest_parser.add_argument("-o", "--output", default="-", help="JSONL输出文件（默认输出到标准输出）")
+    
+    shard_parser = subparsers.add_parser("shard", help="提取清单中一个分片的标题候选")
+    shard_parser.add_argument("manifest", help="清单文件")
+    add_shard_selection(shard_parser, required=True)
+    shard_parser.add_argument("--results-dir", required=True, help="分片结果目录（各节点共享）")
+    shard_parser.add_argument("--retry-failed", action="store_true", help="重新处理上次记录为失败的文件")
+    shard_parser.add_argument("--dedupe", action="store_true",
+                              help="分片内内容相同的副本只提取一次")
+    add_extractor_arguments(shard_parser)
+    # 缓存默认位于用户目录，集群中通常在NFS上，SQLite的WAL模式在网络文件系统上不可靠，
+    # 分片节点默认不使用缓存，只有指定--cache-path（节点本地磁盘上的路径）时才启用
+    shard_parser.set_defaults(cache_by_default=False)
+    add_metrics_arguments(shard_parser)
+    
+    merge_parser = subparsers.add_parser("merge", help="合并分片结果，生成重命名计划")
+    merge_parser.add_argument("manifest", help="清单文件")
+    merge_parser.add_argument("--count", type=int, required=True, help="分片总数")
+    merge_parser.add_argument("--results-dir", required=True, help="分片结果目录")
+    merge_parser.add_argument("--plan", required=True, help="输出的重命名计划文件")
+    merge_parser.add_argument("-o", "--output", default="-", help="JSONL输出文件（默认输出到标准输出）")
+    
+    apply_parser = subparsers.add_parser("apply", help="按重命名计划重命名文件")
+    apply_parser.add_argument("plan", help="重命名计划文件")
+    add_shard_selection(apply_parser, required=False)
+    apply_parser.add_argument("--dry-run", action="store_true", help="只检查计划，不实际重命名")
+    add_journal_arguments(apply_parser)
+    apply_parser.add_argument("-o", "--output", default="-", help="JSONL输出文件（默认输出到标准输出）")
+    return parser
+
+
+def create_extractor(args) -> PDFTitleExtractor:
+    """根据命令行参数创建提取器"""
+    extractor = PDFTitleExtractor()
+    extractor.max_workers = args.workers
+    extractor.extraction_mode = args.mode
+    extractor.backend = args.backend
+    extractor.title_region_ratio = args.region_ratio
+    extractor.use_metadata = args.metadata
+    extractor.metadata_require_code = args.metadata_require_code
+    extractor.task_timeout = args.timeout or None
+    extractor.memory_limit_mb = args.memory_limit or None
+    if not args.no_cache and (args.cache_by_default or args.cache_path):
+        from core.title_cache import TitleCache
+        try:
+            extractor.cache = TitleCache(args.cache_path)
+        except Exception as e:
+            print(f"缓存不可用，已禁用: {e}", file=sys.stderr)
+    return extractor
+
+
+def start_metrics(args, extractor: PDFTitleExtractor):
+    """指定了指标文件时，为提取器启用批量处理指标并开始定期写入，返回写入器（未指定时返回None）"""
+    if not args.metrics_json and not args.metrics_prom:
+        return None
+    from core.metrics import BatchMetrics, MetricsWriter
+    extractor.metrics = BatchMetrics()
+    return MetricsWriter(extractor.metrics, args.metrics_json, args.metrics_prom,
+                         args.metrics_interval).start()
+
+
+def open_journal(args):
+    """根据命令行参数打开重命名日志，不需要记录时返回None"""
+    if args.no_journal or args.dry_run:
+        return None
+    from core.journal import RenameJournal
+    return RenameJournal(args.journal)
+
+
+def write_record(output, record: dict):
+    """写出一行JSON并立即刷新"""
+    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+    output.flush()
+
+
+def run_batch(args, output) -> int:
+    """执行extract/rename命令，返回失败的文件数"""
+    extractor = create_extractor(args)
+    extractor.detect_duplicates = args.dedupe
+    rename = args.command == "rename"
+
+    profile = None
+    if args.profile:
+        # 单进程顺序处理时，两次结果之间记录的阶段均属于同一个文件
+        profile = StageProfile()
+        extractor.stage_callback = profile
+        extractor.max_workers = 1
+
+    journal = open_journal(args) if rename else None
+    batch = journal.begin_batch(" ".join(args.inputs)) if journal is not None else None
+    
+    pdf_files = iter_pdf_files(args.inputs)
+    if rename and args.resume:
+        # 已重命名完成的文件以新文件名出现在目录中，跳过它们，不再重新提取
+        from core.journal import completed_paths, default_journal_path
+        _, outputs = completed_paths(args.journal or default_journal_path())
+        pdf_files = [path for path in pdf_files if path not in outputs]
+    
+    metrics_writer = start_metrics(args, extractor)
+    try:
+        failures = process_results(args, output, extractor, profile, batch,
+                                   extractor.extract_batch(pdf_files))
+    finally:
+        if journal is not None:
+            batch.end()
+            journal.close()
+        if metrics_writer is not None:
+            metrics_writer.stop()
+    return failures
+
+
+def process_results(args, output, extractor, profile, batch, results) -> int:
+    """输出每个文件的处理记录（rename命令同时重命名），返回失败的文件数"""
+    rename = args.command == "rename"
+    failures = 0
+    # 新文件名在内存中分配，每个目录只读取一次文件列表
+    name_index = DirectoryNameIndex()
+    for result in results:
+        record = {
+            "path": result.path,
+            "candidates": [[text, size] for text, size in result.candidates],
+            "chosen_name": None,
+            "elapsed": round(result.elapsed, 4),
+            "status": "success",
+        }
+        if result.duplicate_of:
+            record["duplicate_of"] = result.duplicate_of
+        if profile is not None:
+            record["stages"] = profile.summary()
+            profile.reset()
+        if not has_usable_title(result.candidates):
+            record["status"] = "failed"
+            record["error"] = result.candidates[0][0] if result.candidates else "无法提取标题"
+            failures += 1
+        elif rename:
+            start = time.perf_counter()
+            try:
+                new_path = rename_with_title(extractor, result.path, result.candidates[0][0],
+                                             dry_run=args.dry_run, journal=batch,
+                                             name_index=name_index)
+                record["chosen_name"] = os.path.basename(new_path)
+                record["new_path"] = new_path
+                if extractor.metrics is not None:
+                    extractor.metrics.observe_rename(time.perf_counter() - start)
+            except OSError as e:
+                record["status"] = "failed"
+                record["error"] = str(e)
+                failures += 1
+                if extractor.metrics is not None:
+                    extractor.metrics.observe_rename(time.perf_counter() - start, e)
+        else:
+            record["chosen_name"] = extractor.process_filename(
+                result.candidates[0][0], os.path.basename(result.path))
+        write_record(output, record)
+
+    return failures
+
+
+def run_watch(args, output) -> int:
+    """执行watch命令，直到按Ctrl+C停止，返回失败的文件数"""
+    from core.watcher import FolderWatcher
+    
+    for directory in args.inputs:
+        if not os.path.isdir(directory):
+            raise SystemExit(f"不是目录: {directory}")
+    
+    failures = 0
+    
+    def on_result(record: dict):
+        nonlocal failures
+        if record["status"] != "success":
+            failures += 1
+        write_record(output, record)
+    
+    journal = open_journal(args)
+    watcher = FolderWatcher(
+        create_extractor(args),
+        args.inputs,
+        recursive=args.recursive,
+        workers=args.workers,
+        settle_seconds=args.settle,
+        poll_interval=args.poll_interval,
+        queue_size=args.queue_size,
+        use_polling=args.polling,
+        process_existing=args.process_existing,
+        dry_run=args.dry_run,
+        journal=journal.begin_batch("watch " + " ".join(args.inputs)) if journal is not None else None,
+        on_result=on_result
+    )
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    finally:
+        if journal is not None:
+            watcher.journal.end()
+            journal.close()
+    return failures
+
+
+def run_undo(args, output) -> int:
+    """执行undo命令，返回未能恢复的文件数"""
+    from core.journal import RenameJournal
+    
+    journal = RenameJournal(args.journal)
+    try:
+        results = journal.undo(args.batch)
+    finally:
+        journal.close()
+    if not results:
+        print("没有可撤销的重命名", file=sys.stderr)
+    failures = 0
+    for current_path, restored_path, error in results:
+        record = {"path": current_path, "restored_path": restored_path, "status": "success"}
+        if error:
+            record["status"] = "failed"
+            record["error"] = error
+            failures += 1
+        write_record(output, record)
+    return failures
+
+
+def run_duplicates(args, output) -> int:
+    """执行duplicates命令：每组内容相同的文件输出一行，返回0"""
+    from core.fingerprint import find_duplicates
+    
+    for original, copies in find_duplicates(iter_pdf_files(args.inputs)).items():
+        write_record(output, {
+            "path": original,
+            "duplicates": copies,
+            "size": os.path.getsize(original),
+        })
+    return 0
+
+
+def run_serve(args, output) -> int:
+    """执行serve命令：启动时输出监听地址，之后每个请求输出一行访问记录，按Ctrl+C停止"""
+    import signal
+    import threading
+    from core.service import ExtractionServer, ExtractionService
+    
+    output_lock = threading.Lock()
+    
+    def on_request(record: dict):
+        # 请求在各自的线程中处理，逐行输出时加锁避免交错
+        with output_lock:
+            write_record(output, record)
+    
+    extractor = create_extractor(args)
+    extractor.detect_duplicates = True
+    service = ExtractionService(extractor, args.workers)
+    server = ExtractionServer((args.host, args.port), service, max_body_mb=args.max_body,
+                              on_request=on_request)
+    host, port = server.server_address[:2]
+    write_record(output, {"listening": f"http://{host}:{port}", "workers": service.workers})
+    
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    
+    # 作为后台服务运行时通常以SIGTERM停止，与Ctrl+C一样关闭工作进程后退出
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+def run_manifest(args, output) -> int:
+    """执行manifest命令，输出清单中的文件数"""
+    from core.sharding import write_manifest
+    
+    count = write_manifest(iter_pdf_files(args.inputs), args.manifest)
+    write_record(output, {"manifest": args.manifest, "files": count})
+    return 0
+
+
+def run_shard_command(args, output) -> int:
+    """执行shard命令，返回失败的文件数"""
+    from core.sharding import run_shard
+    
+    extractor = create_extractor(args)
+    extractor.detect_duplicates = args.dedupe
+    metrics_writer = start_metrics(args, extractor)
+    try:
+        _, failures = run_shard(extractor, args.manifest, args.index, args.count, args.results_dir,
+                                retry_failed=args.retry_failed,
+                                on_result=lambda record: write_record(output, record))
+    finally:
+        if metrics_writer is not None:
+            metrics_writer.stop()
+    return failures
+
+
+def run_merge(args, output) -> int:
+    """执行merge命令，输出统计信息；有分片结果缺失时返回缺失的文件数"""
+    from core.sharding import merge_results
+    
+    stats = merge_results(PDFTitleExtractor(), args.manifest, args.results_dir, args.count, args.plan)
+    write_record(output, dict(plan=args.plan, **stats))
+    if stats["missing"]:
+        print(f"有{stats['missing']}个文件没有分片结果（缺少{stats['missing_shards']}个分片的结果文件）",
+              file=sys.stderr)
+    return stats["missing"]
+
+
+def run_apply(args, output) -> int:
+    """执行apply命令，返回失败的文件数"""
+    from core.sharding import apply_plan
+    
+    journal = open_journal(args)
+    batch = journal.begin_batch(f"apply {args.plan} {args.index}/{args.count}") if journal is not None else None
+    failures = 0
+    try:
+        for record in apply_plan(args.plan, journal=batch, dry_run=args.dry_run,
+                                 shard_index=args.index, shard_count=args.count):
+            if record["status"] == "failed":
+                failures += 1
+            write_record(output, record)
+    finally:
+        if journal is not None:
+            batch.end()
+            journal.close()
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command in ("shard", "apply", "merge"):
+        from core.sharding import check_shard
+        try:
+            check_shard(getattr(args, "index", 0), args.count)
+        except ValueError as e:
+            parser.error(str(e))
+    run = {"watch": run_watch, "undo": run_undo, "duplicates": run_duplicates,
+           "manifest": run_manifest, "shard": run_shard_command, "merge": run_merge,
+           "apply": run_apply, "serve": run_serve}.get(args.command, run_batch)
+    if args.output == "-":
+        # JSONL统一使用UTF-8编码，避免Windows控制台默认编码导致输出失败
+        if hasattr(sys.stdout, "reconfigure"):
+            sys.stdout.reconfigure(encoding="utf-8")
+        try:
+            failures = run(args, sys.stdout)
+        except BrokenPipeError:
+            # 输出被管道另一端关闭（如 | head）：不再输出，将标准输出指向空设备，
+            # 避免解释器退出时刷新缓冲区再次出错
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            os.close(devnull)
+            return 1
+    else:
+        with open(args.output, "w", encoding="utf-8") as output:
+            failures = run(args, output)
+    return 1 if failures else 0
@@ -0,0 +1,91 @@
+"""
+PDF文件内容指纹与重复文件查找
+先用文件大小和开头一段内容的哈希快速区分文件，只有这两者都相同时才读取全部内容计算完整哈希，
+因此大多数文件只需读取开头一小段，内容相同的副本只需提取一次标题。
+"""
+import os
+import hashlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from core.title_cache import file_content_hash
+
+# 快速指纹读取的文件开头长度（字节）
+PREFIX_BYTES = 64 * 1024
+
+
+def prefix_fingerprint(file_path: str, size: int, prefix_bytes: int = PREFIX_BYTES) -> Tuple[int, str]:
+    """(文件大小, 文件开头prefix_bytes字节的SHA-1)，不同的快速指纹一定对应不同的内容"""
+    with open(file_path, 'rb') as f:
+        prefix = f.read(prefix_bytes)
+    return size, hashlib.sha1(prefix).hexdigest()
+
+
+class DuplicateIndex:
+    """
+    按内容查找重复文件：依次加入文件，返回与之内容相同的、最先加入的文件
+    文件较小（不超过prefix_bytes）时快速指纹即完整内容，不再计算完整哈希
+    """
+
+    def __init__(self, prefix_bytes: int = PREFIX_BYTES):
+        self.prefix_bytes = prefix_bytes
+        # 快速指纹 -> 具有该指纹的第一个文件（尚未计算完整哈希）
+        self._by_prefix: Dict[Tuple[int, str], str] = {}
+        # 完整哈希 -> 具有该内容的第一个文件
+        self._by_hash: Dict[str, str] = {}
+        self._hashed: Set[str] = set()  # 已计算完整哈希的文件
+        self.full_hashes = 0  # 计算完整哈希的文件数
+
+    def _full_hash(self, file_path: str) -> str:
+        self.full_hashes += 1
+        return file_content_hash(file_path)
+
+    def add(self, file_path: str) -> Optional[str]:
+        """
+        加入文件，内容与之前加入的某个文件相同时返回那个文件的路径，否则返回None
+        无法读取的文件不参与比较（返回None）
+        """
+        try:
+            size = os.path.getsize(file_path)
+            key = prefix_fingerprint(file_path, size, self.prefix_bytes)
+        except OSError:
+            return None
+
+        first = self._by_prefix.get(key)
+        if first is None:
+            self._by_prefix[key] = file_path
+            return None
+        if size <= self.prefix_bytes:
+            return first
+
+        # 快速指纹相同：计算完整哈希区分（第一个文件的完整哈希在第一次冲突时才计算）
+        try:
+            if first not in self._hashed:
+                self._by_hash.setdefault(self._full_hash(first), first)
+                self._hashed.add(first)
+            digest = self._full_hash(file_path)
+            self._hashed.add(file_path)
+        except OSError:
+            return None
+        original = self._by_hash.get(digest)
+        if original is None:
+            self._by_hash[digest] = file_path
+        return original
+
+    def group(self, file_paths: Iterable[str]) -> Tuple[List[str], Dict[str, List[str]]]:
+        """
+        返回 (内容互不相同的文件列表, 文件 -> 与之内容相同的其他文件列表)，保持输入顺序
+        """
+        unique = []
+        copies: Dict[str, List[str]] = {}
+        for file_path in file_paths:
+            original = self.add(file_path)
+            if original is None:
+                unique.append(file_path)
+            else:
+                copies.setdefault(original, []).append(file_path)
+        return unique, copies
+
+
+def find_duplicates(file_paths: Iterable[str]) -> Dict[str, List[str]]:
+    """查找内容相同的文件：返回 最先出现的文件 -> 其余副本 的字典（只包含有副本的文件）"""
+    return DuplicateIndex().group(file_paths)[1]
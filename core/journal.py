@@ -0,0 +1,338 @@
+"""
+重命名日志
+每次重命名先写入意图记录，完成后写入结果记录（JSONL，只追加）。
+写入的记录立即交给操作系统，fsync按条数和时间批量执行；
+程序崩溃后可以据此跳过已完成的文件继续处理，或将整批重命名撤销。
+日志在打开时压缩：已撤销的批次和失败的重命名被删除，只保留最近的批次，更早的批次追加到归档文件。
+"""
+import os
+import json
+import time
+import uuid
+import threading
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from core.title_cache import default_cache_dir
+
+# 记录类型
+BEGIN = "begin"    # 批次开始
+INTENT = "intent"  # 即将重命名 old -> new
+DONE = "done"      # 重命名完成
+FAILED = "failed"  # 重命名失败
+END = "end"        # 批次结束
+UNDO = "undo"      # 撤销了一次重命名（new -> old）
+UNDONE = "undone"  # 整批撤销完成
+
+# 日志超过该大小（字节）时在打开时压缩
+COMPACT_MIN_BYTES = 256 * 1024
+# 压缩后主日志保留的批次数，更早的批次追加到归档文件（<日志>.1）
+KEEP_BATCHES = 100
+# 有未结束的批次时，日志在该时间（秒）内被修改过则视为其他进程可能正在写入，不压缩
+ACTIVE_BATCH_SECONDS = 3600
+
+
+def default_journal_path() -> str:
+    return os.path.join(default_cache_dir(), "rename_journal.jsonl")
+
+
+def archive_path(journal_path: str) -> str:
+    """压缩时移出的批次所在的归档文件"""
+    return journal_path + ".1"
+
+
+class BatchRecord:
+    """从日志中读出的一个批次"""
+
+    def __init__(self, batch_id: str, label: str = "", started: float = 0.0):
+        self.batch_id = batch_id
+        self.label = label
+        self.started = started
+        self.renames: Dict[str, Tuple[str, str]] = {}  # 原路径 -> (新路径, 状态)
+        self.ended = False
+        self.undone = False
+
+    def completed(self) -> List[Tuple[str, str]]:
+        """
+        按完成顺序返回已完成的 (原路径, 新路径)
+        只有意图记录的重命名（写入结果前崩溃）根据文件是否存在判断是否已完成
+        """
+        completed = []
+        for old, (new, status) in self.renames.items():
+            if status == INTENT:
+                if not (new and os.path.exists(new) and not os.path.exists(old)):
+                    continue
+            elif status != DONE:
+                continue
+            completed.append((old, new))
+        return completed
+
+
+class JournalIndex:
+    """
+    日志内容的内存索引：每次refresh只读取上次读取之后追加的完整行，
+    不必在每次撤销或继续处理时重新解析整个日志；日志被替换（压缩）后重新读取
+    """
+
+    def __init__(self, journal_path: str):
+        self.journal_path = journal_path
+        self.batches: Dict[str, BatchRecord] = {}
+        self._offset = 0
+        self._inode = None
+
+    def refresh(self) -> Dict[str, BatchRecord]:
+        """读取新追加的记录，按批次开始的顺序返回全部批次"""
+        try:
+            stat = os.stat(self.journal_path)
+        except OSError:
+            self.batches, self._offset, self._inode = {}, 0, None
+            return self.batches
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self.batches, self._offset, self._inode = {}, 0, stat.st_ino
+        if stat.st_size == self._offset:
+            return self.batches
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # 崩溃时可能只写了一半的最后一行留到下次（或永远）不读取
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            self._apply(line)
+        self._offset += end
+        return self.batches
+
+    def _apply(self, line: bytes):
+        try:
+            record = json.loads(line.decode("utf-8"))
+            kind = record["type"]
+            batch_id = record["batch"]
+        except (ValueError, KeyError, TypeError):
+            return
+        batch = self.batches.get(batch_id)
+        if batch is None:
+            batch = self.batches[batch_id] = BatchRecord(batch_id)
+        if kind == BEGIN:
+            batch.label = record.get("label", "")
+            batch.started = record.get("time", 0.0)
+        elif kind in (INTENT, DONE, FAILED):
+            old = record.get("old")
+            if old is None:
+                return
+            # 完成后记录移到末尾，保持完成顺序
+            batch.renames.pop(old, None)
+            batch.renames[old] = (record.get("new", ""), kind)
+        elif kind == UNDO:
+            batch.renames.pop(record.get("old"), None)
+        elif kind == END:
+            batch.ended = True
+        elif kind == UNDONE:
+            batch.undone = True
+
+
+def read_journal(journal_path: str) -> Dict[str, BatchRecord]:
+    """读取日志，按批次开始的顺序返回；崩溃时可能只写了一半的最后一行会被忽略"""
+    return JournalIndex(journal_path).refresh()
+
+
+def _completed_paths(batches: Dict[str, BatchRecord]) -> Tuple[Set[str], Set[str]]:
+    sources, outputs = set(), set()
+    for batch in batches.values():
+        for old, new in batch.completed():
+            sources.add(old)
+            outputs.add(new)
+    return sources, outputs
+
+
+def completed_paths(journal_path: str) -> Tuple[Set[str], Set[str]]:
+    """返回日志中已完成重命名的 (原路径集合, 新路径集合)，用于中断后继续处理时跳过这些文件"""
+    return _completed_paths(read_journal(journal_path))
+
+
+def _compacted_records(batches: List[BatchRecord]) -> Iterator[Dict]:
+    """批次的压缩记录：开始、已完成的重命名，以及原有的结束记录（中断的批次仍保持未结束）"""
+    for batch in batches:
+        yield {"type": BEGIN, "batch": batch.batch_id, "label": batch.label, "time": batch.started}
+        for old, new in batch.completed():
+            yield {"type": DONE, "batch": batch.batch_id, "old": old, "new": new}
+        if batch.ended:
+            yield {"type": END, "batch": batch.batch_id, "time": batch.started}
+
+
+def _append_records(path: str, records: Iterable[Dict]):
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _replace_records(path: str, records: Iterable[Dict]):
+    """写入临时文件后替换原文件，读取方不会读到写了一半的日志"""
+    temp_path = f"{path}.tmp{os.getpid()}"
+    _append_records(temp_path, records)
+    os.replace(temp_path, path)
+
+
+def compact_journal(journal_path: str, keep_batches: int = KEEP_BATCHES) -> bool:
+    """
+    压缩日志：删除已撤销的批次和没有完成任何重命名的批次，删除失败和中间记录，
+    只保留最近keep_batches个批次，更早的批次追加到归档文件（<日志>.1），仍可按批次撤销
+    有未结束的批次且日志在ACTIVE_BATCH_SECONDS内被修改过时（可能有其他进程正在写入）不压缩
+    返回是否进行了压缩
+    """
+    try:
+        modified = os.stat(journal_path).st_mtime
+    except OSError:
+        return False
+    batches = read_journal(journal_path)
+    active = any(not batch.ended and not batch.undone for batch in batches.values())
+    if active and time.time() - modified < ACTIVE_BATCH_SECONDS:
+        return False
+    kept = [batch for batch in batches.values() if not batch.undone and batch.completed()]
+    split = max(0, len(kept) - keep_batches)
+    archived, kept = kept[:split], kept[split:]
+    if archived:
+        _append_records(archive_path(journal_path), _compacted_records(archived))
+    _replace_records(journal_path, _compacted_records(kept))
+    return True
+
+
+class JournalBatch:
+    """一个批次的重命名，可作为 rename_with_title 的 journal 参数"""
+
+    def __init__(self, journal: 'RenameJournal', batch_id: str):
+        self.journal = journal
+        self.batch_id = batch_id
+
+    def rename(self, old_path: str, new_path: str):
+        """重命名文件并记录日志，失败时记录后重新抛出异常"""
+        self.journal._write({"type": INTENT, "batch": self.batch_id, "old": old_path, "new": new_path})
+        try:
+            os.rename(old_path, new_path)
+        except OSError as e:
+            self.journal._write({"type": FAILED, "batch": self.batch_id, "old": old_path,
+                                 "new": new_path, "error": str(e)})
+            raise
+        self.journal._write({"type": DONE, "batch": self.batch_id, "old": old_path, "new": new_path})
+
+    def end(self):
+        self.journal._write({"type": END, "batch": self.batch_id, "time": time.time()})
+        self.journal.sync()
+
+
+class RenameJournal:
+    """
+    只追加的重命名日志，可在多个线程中同时写入
+    sync_every、sync_interval：累计多少条记录或经过多少秒后执行一次fsync
+    """
+
+    def __init__(self, journal_path: Optional[str] = None,
+                 sync_every: int = 200, sync_interval: float = 1.0):
+        self.journal_path = journal_path or default_journal_path()
+        directory = os.path.dirname(os.path.abspath(self.journal_path))
+        os.makedirs(directory, exist_ok=True)
+        try:
+            if os.path.getsize(self.journal_path) >= COMPACT_MIN_BYTES:
+                compact_journal(self.journal_path)
+        except OSError:
+            pass
+        self._index = JournalIndex(self.journal_path)
+        self._index_lock = threading.Lock()
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._file = open(self.journal_path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            if (self._unsynced >= self.sync_every
+                    or time.monotonic() - self._last_sync >= self.sync_interval):
+                self._sync_locked()
+
+    def _sync_locked(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        with self._lock:
+            self._file.flush()
+            self._sync_locked()
+
+    def begin_batch(self, label: str = "") -> JournalBatch:
+        batch_id = uuid.uuid4().hex[:12]
+        self._write({"type": BEGIN, "batch": batch_id, "label": label, "time": time.time()})
+        return JournalBatch(self, batch_id)
+
+    def batches(self) -> Dict[str, BatchRecord]:
+        """日志中的全部批次（只读取上次之后追加的记录，包括其他进程写入的）"""
+        self.sync()
+        with self._index_lock:
+            return self._index.refresh()
+
+    def interrupted_outputs(self) -> Set[str]:
+        """
+        中断的批次（没有结束记录且未撤销）中已完成的重命名生成的文件路径，
+        重新导入时应跳过，避免把已重命名的文件再重命名一次
+        """
+        interrupted = {batch_id: batch for batch_id, batch in self.batches().items()
+                       if not batch.ended and not batch.undone}
+        return _completed_paths(interrupted)[1]
+
+    def last_batch(self) -> Optional[BatchRecord]:
+        """最近一个尚未撤销且有已完成重命名的批次"""
+        for batch in reversed(list(self.batches().values())):
+            if not batch.undone and batch.completed():
+                return batch
+        return None
+
+    def undo(self, batch_id: Optional[str] = None) -> List[Tuple[str, str, str]]:
+        """
+        按相反顺序撤销一个批次（默认为最近的批次）的重命名
+        返回：[(当前路径, 恢复的路径, 错误信息)]，错误信息为空表示成功
+        """
+        write = self._write
+        if batch_id is None:
+            batch = self.last_batch()
+        else:
+            batch = self.batches().get(batch_id)
+            if batch is None:
+                # 压缩时移入归档的批次，撤销记录同样写入归档文件
+                batch = read_journal(archive_path(self.journal_path)).get(batch_id)
+                write = partial(self._write_archive, archive_path(self.journal_path))
+        if batch is None:
+            return []
+
+        results = []
+        for old_path, new_path in reversed(batch.completed()):
+            error = ""
+            try:
+                if os.path.exists(old_path):
+                    raise FileExistsError(f"原文件名已被占用: {old_path}")
+                os.rename(new_path, old_path)
+                write({"type": UNDO, "batch": batch.batch_id, "old": old_path, "new": new_path})
+            except OSError as e:
+                error = str(e)
+            results.append((new_path, old_path, error))
+        if not any(error for _, _, error in results):
+            write({"type": UNDONE, "batch": batch.batch_id, "time": time.time()})
+        self.sync()
+        return results
+
+    def _write_archive(self, path: str, record: Dict):
+        with self._lock:
+            _append_records(path, (record,))
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                self._sync_locked()
+                self._file.close()
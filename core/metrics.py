@@ -0,0 +1,282 @@
+"""
+批量处理的吞吐量与延迟指标
+记录处理速度（文件/秒）、提取和重命名的耗时分布、按原因分类的失败数、待处理队列长度和工作进程利用率，
+可定期写入JSON文件和Prometheus文本格式文件（供node_exporter的textfile收集器读取），
+用于比较不同批次（如每晚的定时任务）变慢的原因。
+"""
+import os
+import json
+import time
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+from core.pdf_processor import ERROR_TITLE_PREFIX, NO_TITLE_MESSAGES, ExtractionResult
+
+# 耗时分布的桶上限（秒），重命名通常在1毫秒以内，提取在0.1秒到数十秒之间
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# 定期写入指标文件的间隔（秒）
+DEFAULT_WRITE_INTERVAL = 10.0
+# Prometheus指标名前缀
+PROMETHEUS_PREFIX = "pdf_title"
+
+# 提取结果的来源
+SOURCE_WORKER = "worker"        # 在工作进程（或单进程模式下在当前进程）中提取
+SOURCE_CACHE = "cache"          # 标题缓存或界面中已保存的候选
+SOURCE_DUPLICATE = "duplicate"  # 内容相同的副本，复用其他文件的提取结果
+
+# 失败原因分类：按顺序匹配错误信息中的关键字
+ERROR_CLASSES = (
+    ("处理超时", "timeout"),
+    ("内存超出限制", "memory_limit"),
+    ("工作进程异常退出", "worker_crash"),
+)
+
+
+def classify_error(result: ExtractionResult) -> Optional[str]:
+    """提取结果的失败原因分类，有可用标题时返回None"""
+    if result.error:
+        for keyword, error_class in ERROR_CLASSES:
+            if keyword in result.error:
+                return error_class
+        return "cancelled" if result.error == "CancelledError" else "extraction_error"
+    if not result.candidates:
+        return "no_title"
+    title = result.candidates[0][0]
+    if title.startswith(ERROR_TITLE_PREFIX):
+        return "extraction_error"
+    if title in NO_TITLE_MESSAGES:
+        return "no_title"
+    return None
+
+
+class Histogram:
+    """固定桶的耗时分布，分位数按桶内线性插值估算"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个为超出所有桶上限的数量
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.5), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "max": round(self.max, 6),
+            # 累计数量，与Prometheus的le标签含义相同
+            "buckets": {f"{bound:g}": cumulative for bound, cumulative in
+                        zip(self.buckets + (float("inf"),), self._cumulative())},
+        }
+
+    def _cumulative(self) -> List[int]:
+        total = 0
+        result = []
+        for bucket_count in self.counts:
+            total += bucket_count
+            result.append(total)
+        return result
+
+
+class BatchMetrics:
+    """
+    一次批量处理的指标，可在多个线程中同时记录
+    提取结果由PDFTitleExtractor在批量提取时记录（设置extractor.metrics），
+    重命名由调用方记录（observe_rename）
+    """
+
+    def __init__(self, workers: int = 1):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.started_at = time.time()
+        self.workers = workers
+        self.planned = 0  # 已提交的文件数
+        self.completed = 0  # 已得到提取结果的文件数
+        self.sources: Counter = Counter()  # 提取结果来源 -> 文件数
+        self.failures: Counter = Counter()  # 失败原因分类 -> 文件数
+        self.renamed = 0
+        self.extraction = Histogram()
+        self.rename = Histogram()
+        self.worker_busy = 0.0  # 工作进程处理文件的累计耗时（秒）
+
+    def set_workers(self, workers: int):
+        with self._lock:
+            self.workers = max(1, workers)
+
+    def add_planned(self, count: int):
+        with self._lock:
+            self.planned += count
+
+    def observe_extraction(self, result: ExtractionResult, source: str = SOURCE_WORKER):
+        """记录一个文件的提取结果"""
+        error_class = classify_error(result)
+        with self._lock:
+            self.completed += 1
+            self.sources[source] += 1
+            if source == SOURCE_WORKER:
+                self.extraction.observe(result.elapsed)
+                self.worker_busy += result.elapsed
+            if error_class is not None:
+                self.failures[error_class] += 1
+
+    def observe_rename(self, elapsed: float, error: Optional[BaseException] = None):
+        """记录一次重命名的耗时，失败时按异常类型分类"""
+        with self._lock:
+            self.rename.observe(elapsed)
+            if error is None:
+                self.renamed += 1
+            else:
+                self.failures[f"rename_{type(error).__name__}"] += 1
+
+    def snapshot(self) -> Dict:
+        """当前指标的字典形式（写入JSON文件和界面显示使用）"""
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            return {
+                "started_at": round(self.started_at, 3),
+                "elapsed": round(elapsed, 3),
+                "planned": self.planned,
+                "completed": self.completed,
+                "renamed": self.renamed,
+                "files_per_sec": round(self.completed / elapsed, 3),
+                "queue_depth": max(0, self.planned - self.completed),
+                "workers": self.workers,
+                "worker_utilization": round(min(1.0, self.worker_busy / (self.workers * elapsed)), 4),
+                "sources": dict(self.sources),
+                "failures": dict(self.failures),
+                "extraction_seconds": self.extraction.summary(),
+                "rename_seconds": self.rename.summary(),
+            }
+
+    def to_prometheus(self) -> str:
+        """Prometheus文本格式（exposition format 0.0.4）"""
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples):
+            full_name = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape_label(str(val))}"' for key, val in labels)
+                lines.append(f"{full_name}{{{label_text}}} {value}" if label_text
+                             else f"{full_name} {value}")
+
+        metric("batch_start_time_seconds", "gauge", "Unix time the batch started",
+               [((), snapshot["started_at"])])
+        metric("files_planned_total", "counter", "Files submitted for extraction",
+               [((), snapshot["planned"])])
+        metric("files_completed_total", "counter", "Files with an extraction result",
+               [((), snapshot["completed"])])
+        metric("files_by_source_total", "counter", "Extraction results by source",
+               [((("source", source),), count) for source, count in sorted(snapshot["sources"].items())])
+        metric("files_renamed_total", "counter", "Files renamed successfully",
+               [((), snapshot["renamed"])])
+        metric("failures_total", "counter", "Failed files by error class",
+               [((("error_class", error_class),), count)
+                for error_class, count in sorted(snapshot["failures"].items())])
+        metric("files_per_second", "gauge", "Average throughput since the batch started",
+               [((), snapshot["files_per_sec"])])
+        metric("queue_depth", "gauge", "Files submitted but not yet completed",
+               [((), snapshot["queue_depth"])])
+        metric("workers", "gauge", "Extraction worker processes", [((), snapshot["workers"])])
+        metric("worker_utilization_ratio", "gauge", "Share of worker time spent extracting",
+               [((), snapshot["worker_utilization"])])
+        for name, key, help_text in (
+                ("extraction_seconds", "extraction_seconds", "Per-file extraction latency in workers"),
+                ("rename_seconds", "rename_seconds", "Per-file rename latency")):
+            summary = snapshot[key]
+            full_name = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} histogram")
+            for bound, cumulative in summary["buckets"].items():
+                le = "+Inf" if bound == "inf" else bound
+                lines.append(f'{full_name}_bucket{{le="{le}"}} {cumulative}')
+            lines.append(f"{full_name}_sum {summary['sum']}")
+            lines.append(f"{full_name}_count {summary['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _write_atomic(path: str, text: str):
+    """先写入临时文件再替换，读取方不会读到写了一半的文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp{os.getpid()}"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+class MetricsWriter:
+    """
+    后台线程每隔interval秒将指标写入JSON文件和/或Prometheus文本文件，stop时再写入一次最终结果
+    json_path、prom_path为None时不写入对应格式
+    """
+
+    def __init__(self, metrics: BatchMetrics, json_path: Optional[str] = None,
+                 prom_path: Optional[str] = None, interval: float = DEFAULT_WRITE_INTERVAL):
+        self.metrics = metrics
+        self.json_path = json_path
+        self.prom_path = prom_path
+        self.interval = max(0.1, interval)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "MetricsWriter":
+        self._thread.start()
+        return self
+
+    def write(self):
+        """立即写入指标文件，写入失败时忽略（不影响批量处理本身）"""
+        try:
+            if self.json_path:
+                _write_atomic(self.json_path,
+                              json.dumps(self.metrics.snapshot(), ensure_ascii=False, indent=2) + "\n")
+            if self.prom_path:
+                _write_atomic(self.prom_path, self.metrics.to_prometheus())
+        except OSError:
+            pass
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.write()
@@ -1,8 +1,134 @@
-import pdfplumber
 import os
-from typing import List, Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, List, Dict, Optional, Tuple, Iterable, Iterator, NamedTuple
 import re
+import time
 import unicodedata
+import queue
+from concurrent.futures import Future
+from functools import lru_cache
+
+if TYPE_CHECKING:
+    from core.supervisor import SupervisedPool
+
+# pdfplumber、pdfminer的导入耗时较长，在第一次提取时才导入（见preload_parsing_stack），
+# 界面和命令行在用到解析功能之前无需等待
+
+
+# 单词提取参数，整页与页首区域提取共用
+WORD_EXTRACTION_OPTIONS = dict(
+    extra_attrs=['size', 'top', 'fontname'],
+    keep_blank_chars=True,  # 保留空格
+    use_text_flow=True,     # 优化文本流识别
+    x_tolerance=3,          # 扩大水平容差，有助于连接同一行的文本
+    y_tolerance=3           # 扩大垂直容差，有助于连接同一段落的文本
+)
+
+# 同一行文本的最大垂直距离（点）
+LINE_TOLERANCE = 5
+
+# 提取失败时返回的占位标题
+NO_TITLE_MESSAGES = ("未能识别标题", "未能识别合适的标题", "PDF文件无页面")
+ERROR_TITLE_PREFIX = "处理出错"
+
+# 文档元数据中常见的无意义标题（生成工具的默认值），比较时忽略大小写
+GENERIC_METADATA_TITLES = frozenset((
+    "untitled", "无标题", "title", "document", "文档", "slide 1", "powerpoint presentation",
+    "microsoft word", "pdf", "scan", "scanned document", "扫描文档",
+))
+# 办公软件导出PDF时在文件名前加的程序名前缀
+METADATA_APPLICATION_PREFIXES = ("microsoft word - ", "microsoft powerpoint - ", "microsoft excel - ")
+# 以文件扩展名结尾或看起来像路径的元数据标题通常只是源文件名
+METADATA_FILENAME_PATTERN = re.compile(
+    r'(\.(pdf|docx?|xlsx?|pptx?|wps|rtf|txt|tmp|tiff?|jpe?g|png)$)|(^/)|(\\)', re.IGNORECASE)
+
+
+def preload_parsing_stack():
+    """导入PDF解析依赖；常驻进程和界面可在空闲时提前调用，使第一次提取无需等待导入"""
+    import pdfplumber
+    import pdfplumber.utils
+    import core.pdfminer_backend
+
+
+def is_extraction_error(candidates: List[Tuple[str, float]]) -> bool:
+    """判断候选列表是否为处理出错的结果"""
+    return not candidates or candidates[0][0].startswith(ERROR_TITLE_PREFIX)
+
+
+def has_usable_title(candidates: List[Tuple[str, float]]) -> bool:
+    """判断候选列表中是否有可用于重命名的标题"""
+    return not is_extraction_error(candidates) and candidates[0][0] not in NO_TITLE_MESSAGES
+
+
+class ExtractionResult(NamedTuple):
+    """批量提取的单个文件结果"""
+    path: str
+    candidates: List[Tuple[str, float]]
+    elapsed: float  # 提取耗时（秒）
+    error: str = ""  # 提取被中止的原因（超时、内存超限、工作进程崩溃），为空表示正常完成
+    duplicate_of: str = ""  # 内容与之相同、提取结果被复用的文件路径，为空表示单独提取
+
+
+class StageProfile:
+    """
+    收集标题提取各阶段的耗时与元素数量，可直接作为 PDFTitleExtractor.stage_callback 使用
+    阶段名称：metadata、open、load_page、extract_words、header_filter、max_font、
+    group_lines、second_size、join_text
+    """
+    
+    def __init__(self):
+        self.records: List[Tuple[str, float, int]] = []  # (阶段, 耗时秒, 元素数量)
+        
+    def __call__(self, stage: str, elapsed: float, count: int):
+        self.records.append((stage, elapsed, count))
+        
+    def reset(self):
+        self.records.clear()
+        
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """按阶段汇总：调用次数、总耗时（毫秒）和元素数量"""
+        result = {}
+        for stage, elapsed, count in self.records:
+            entry = result.setdefault(stage, {"calls": 0, "ms": 0.0, "elements": 0})
+            entry["calls"] += 1
+            entry["ms"] += elapsed * 1000
+            entry["elements"] += count
+        for entry in result.values():
+            entry["ms"] = round(entry["ms"], 3)
+        return result
+
+
+# 文件名中不允许出现的字符（Windows），以及需要合并的连续空白和连续的点
+ILLEGAL_FILENAME_CHARS = re.compile(r'[\\/*?:"<>|]')
+WHITESPACE_RUN = re.compile(r'\s+')
+DOT_RUN = re.compile(r'\.+')
+# 新文件名中标题部分的最大长度
+MAX_TITLE_LENGTH = 100
+
+
+def _classify_western_char(char: str) -> bool:
+    """按Unicode类别判断单个字符是否为西文字符（英文、数字、西文标点等）"""
+    category = unicodedata.category(char)
+    # 大部分西文字符属于Latin类别或标点、数字等
+    return ('L' in category and not unicodedata.name(char, "").startswith('CJK')) or \
+           category.startswith('P') or category.startswith('N')
+
+
+# 拉丁、希腊、西里尔等字母和ASCII标点所在的码位范围预先分类，
+# 范围外的字符（中日韩文字、全角标点等）第一次出现时分类并缓存
+WESTERN_CHAR_TABLE_SIZE = 0x800
+_WESTERN_CHAR_TABLE = bytes(_classify_western_char(chr(code)) for code in range(WESTERN_CHAR_TABLE_SIZE))
+_classify_western_char_cached = lru_cache(maxsize=65536)(_classify_western_char)
+
+
+def is_western_char(char: str) -> bool:
+    """判断字符是否是西文字符（英文、数字、西文标点等），空字符串返回False"""
+    if not char:
+        return False
+    code = ord(char)
+    if code < WESTERN_CHAR_TABLE_SIZE:
+        return _WESTERN_CHAR_TABLE[code] == 1
+    return _classify_western_char_cached(char)
+
 
 class PDFTitleExtractor:
     def __init__(self):
@@ -13,125 +139,467 @@ class PDFTitleExtractor:
         self.min_title_length = 2  # 最小标题长度
         # 字体大小阈值：视为同一字体大小的最大差异（点数）
         self.font_size_threshold = 0.5
+        # 提取模式："full" 分析整个第一页；"header" 只分析页面顶部区域，找不到标题时回退到整页
+        self.extraction_mode = "full"
+        self.title_region_ratio = 0.4  # "header"模式下分析的页面顶部比例
+        # 解析后端："pdfplumber" 使用pdfplumber提取单词；"pdfminer" 直接读取pdfminer字符流，开销更小
+        self.backend = "pdfplumber"
+        # 批量提取时的工作进程数，None表示使用CPU核心数
+        self.max_workers = None
+        # 批量提取时单个文件的处理时间（秒）和工作进程内存（MB）上限，超出时终止该文件的处理，None表示不限制
+        self.task_timeout = 120.0
+        self.memory_limit_mb = 2048
+        # 标题候选缓存（TitleCache），None表示不使用缓存
+        self.cache = None
+        # 阶段计时回调 callback(阶段名, 耗时秒, 元素数量)，None表示不计时（见StageProfile）
+        self.stage_callback = None
+        # 元数据快速通道：文档元数据（XMP dc:title、/Title）中的标题通过以下检查时直接使用，
+        # 不再进行第一页版面分析
+        self.use_metadata = False
+        self.metadata_min_length = 4  # 标题最短长度（包含文件编号的标题不受此限制）
+        self.metadata_max_length = 150  # 标题最大长度
+        self.metadata_require_code = False  # 要求标题或原文件名中包含文件编号（code_pattern）
+        # 批量提取前按内容指纹查找重复文件，内容相同的副本只提取一次，复用提取结果
+        self.detect_duplicates = False
+        # 批量处理指标（core.metrics.BatchMetrics），批量提取时记录每个文件的结果，None表示不记录
+        self.metrics = None
+        # 内存不足时抛出MemoryError而不是返回出错的候选（只在受监督的工作进程中设置，由进程池重新启动工作进程）
+        self.raise_memory_errors = False
+        
+    def __getstate__(self):
+        # 缓存持有数据库连接，不随提取器传入工作进程，由主进程统一读写
+        state = self.__dict__.copy()
+        state['cache'] = None
+        state['stage_callback'] = None
+        state['metrics'] = None
+        return state
+        
+    def _report_stage(self, stage: str, start: float, count: int = 0):
+        """上报从start开始的阶段耗时"""
+        if self.stage_callback is not None:
+            self.stage_callback(stage, time.perf_counter() - start, count)
+        
+    def settings_key(self) -> str:
+        """影响提取结果的参数签名，用于区分缓存条目"""
+        key = (f"{self.header_threshold}|{self.min_title_length}|{self.font_size_threshold}|"
+               f"{self.extraction_mode}|{self.title_region_ratio}")
+        if self.use_metadata:
+            key += (f"|meta:{self.metadata_min_length}|{self.metadata_max_length}|"
+                    f"{self.metadata_require_code}|{self.code_pattern}")
+        return key
         
     def extract_title_candidates(self, pdf_path: str) -> List[Tuple[str, float]]:
         """
-        从PDF文件中提取标题候选列表
+        从PDF文件中提取标题候选列表（优先读取缓存）
         返回：包含(文本, 字体大小)元组的列表
         """
+        if self.cache is not None:
+            cached = self.cache.get(pdf_path, self.settings_key())
+            if cached is not None:
+                return cached
+        
+        candidates = self._extract_title_candidates(pdf_path)
+        self._store_in_cache(pdf_path, candidates)
+        return candidates
+        
+    def _store_in_cache(self, pdf_path: str, candidates: List[Tuple[str, float]]):
+        """写入缓存，处理出错的结果可能是暂时性的（如文件被占用），不写入"""
+        if self.cache is None or is_extraction_error(candidates):
+            return
+        self.cache.put(pdf_path, candidates, self.settings_key())
+        
+    def _extract_title_candidates(self, pdf_path: str) -> List[Tuple[str, float]]:
+        """解析PDF第一页并提取标题候选列表"""
         try:
+            if self.use_metadata:
+                title = self._metadata_title(pdf_path)
+                if title is not None:
+                    return [(title, 0.0)]
+                    
+            if self.backend == "pdfminer":
+                from core.pdfminer_backend import load_first_page
+                first_page = load_first_page(pdf_path, self._report_stage)
+                if first_page is None:
+                    return [("PDF文件无页面", 0.0)]
+                
+                def extract_page_words(region_height=None):
+                    start = time.perf_counter()
+                    words = first_page.extract_words(region_height)
+                    self._report_stage("extract_words", start, len(words))
+                    return words
+                
+                return self._candidates_for_page(first_page.height, extract_page_words)
+            
+            import pdfplumber
+            start = time.perf_counter()
             with pdfplumber.open(pdf_path) as pdf:
+                self._report_stage("open", start)
                 if len(pdf.pages) > 0:
+                    start = time.perf_counter()
                     first_page = pdf.pages[0]
+                    # 预先完成内容流解析，使版面解析与单词提取的耗时可分别统计
+                    layout = first_page.layout
+                    self._report_stage("load_page", start, len(layout._objs))
                     
-                    # 提取带有更多属性的单词
-                    text_elements = first_page.extract_words(
-                        extra_attrs=['size', 'top', 'fontname'],
-                        keep_blank_chars=True,  # 保留空格
-                        use_text_flow=True,     # 优化文本流识别
-                        x_tolerance=3,          # 扩大水平容差，有助于连接同一行的文本
-                        y_tolerance=3           # 扩大垂直容差，有助于连接同一段落的文本
-                    )
+                    def extract_page_words(region_height=None):
+                        start = time.perf_counter()
+                        if region_height is None:
+                            words = self._extract_words(first_page)
+                        else:
+                            words = self._extract_region_words(first_page, region_height)
+                        self._report_stage("extract_words", start, len(words))
+                        return words
                     
-                    if not text_elements:
-                        return [("未能识别标题", 0.0)]
-                    
-                    # 获取页面高度用于页眉判断
-                    page_height = first_page.height
-                    header_height = page_height * self.header_threshold
-                    
-                    # 过滤掉页眉区域的文本和数字页码
-                    filtered_elements = [
-                        elem for elem in text_elements
-                        if not (elem['top'] < header_height or  # 不在页眉区域
-                            elem['text'].isdigit() or  # 不是纯数字
-                            len(elem['text'].strip()) < self.min_title_length)  # 不是过短的文本
-                    ]
-                    
-                    if not filtered_elements:
-                        return [("未能识别合适的标题", 0.0)]
-                    
-                    # 找出最大字体大小
-                    max_font_size = max(elem['size'] for elem in filtered_elements)
-                    
-                    # 获取接近最大字体大小的元素（考虑字体差异范围）
-                    large_font_elements = [
-                        elem for elem in filtered_elements 
-                        if max_font_size - elem['size'] <= self.font_size_threshold
-                    ]
-                    
-                    # 按垂直位置和水平位置排序，以保持阅读顺序
-                    sorted_elements = sorted(
-                        large_font_elements,
-                        key=lambda x: (x['top'], x['x0'])
-                    )
-                    
-                    # 构建候选标题列表
-                    candidates = []
-                    
-                    # 1. 提取最大字体的标题
-                    max_font_title = self._join_text_elements(sorted_elements)
-                    candidates.append((max_font_title, max_font_size))
-                    
-                    # 2. 尝试按行分组，提取可能的标题（处理多行标题）
-                    line_groups = self._group_elements_by_line(sorted_elements)
-                    if len(line_groups) > 1:
-                        # 如果有多行，尝试使用第一行作为候选标题
-                        first_line = self._join_text_elements(line_groups[0])
-                        if first_line != max_font_title:
-                            avg_size = sum(elem['size'] for elem in line_groups[0]) / len(line_groups[0])
-                            candidates.append((first_line, avg_size))
-                    
-                    # 3. 如果还是没有好的候选项，尝试其他次大字体大小
-                    if len(candidates) < 2:
-                        unique_sizes = sorted(set(elem['size'] for elem in filtered_elements), reverse=True)
-                        if len(unique_sizes) > 1:
-                            second_size = unique_sizes[1]
-                            second_elements = [elem for elem in filtered_elements if elem['size'] == second_size]
-                            second_sorted = sorted(second_elements, key=lambda x: (x['top'], x['x0']))
-                            second_title = self._join_text_elements(second_sorted)
-                            candidates.append((second_title, second_size))
-                    
-                    return candidates
+                    return self._candidates_for_page(first_page.height, extract_page_words)
                 else:
                     return [("PDF文件无页面", 0.0)]
                     
         except Exception as e:
-            return [(f"处理出错: {str(e)}", 0.0)]
+            if isinstance(e, MemoryError) and self.raise_memory_errors:
+                raise
+            return [(f"{ERROR_TITLE_PREFIX}: {str(e)}", 0.0)]
+    
+    def _metadata_title(self, pdf_path: str) -> Optional[str]:
+        """返回元数据中第一个可信的标题，没有时返回None"""
+        from core.pdfminer_backend import read_metadata_titles
+        start = time.perf_counter()
+        titles = read_metadata_titles(pdf_path)
+        filename = os.path.basename(pdf_path)
+        trusted = next((title for title in (self.trusted_metadata_title(t, filename) for t in titles)
+                        if title is not None), None)
+        self._report_stage("metadata", start, len(titles))
+        return trusted
+        
+    def trusted_metadata_title(self, title: str, filename: str) -> Optional[str]:
+        """
+        检查元数据标题是否可以代替版面分析的结果
+        返回：规范化空白后的标题；不可信时返回None
+        """
+        title = " ".join(title.split())
+        lowered = title.lower()
+        if not title or lowered in GENERIC_METADATA_TITLES:
+            return None
+        if lowered.startswith(METADATA_APPLICATION_PREFIXES) or METADATA_FILENAME_PATTERN.search(title):
+            return None
+        # 只有数字和符号，或与原文件名相同，都不是真正的标题
+        if not any(char.isalpha() for char in title):
+            return None
+        if lowered == os.path.splitext(filename)[0].lower():
+            return None
+        
+        has_code = re.search(self.code_pattern, title) is not None
+        if len(title) > self.metadata_max_length:
+            return None
+        if len(title) < self.metadata_min_length and not has_code:
+            return None
+        if self.metadata_require_code and not (has_code or re.search(self.code_pattern, filename)):
+            return None
+        return title
+        
+    def _candidates_for_page(self, page_height: float,
+                             extract_page_words: Callable[..., List[Dict]]) -> List[Tuple[str, float]]:
+        """
+        根据提取模式从第一页构建候选标题
+        extract_page_words(region_height=None)：返回整页或页面顶部区域的单词列表
+        """
+        # 获取页面高度用于页眉判断
+        header_height = page_height * self.header_threshold
+        
+        # 页首区域模式：只对页面顶部区域做单词提取，找不到标题时再回退到整页
+        if self.extraction_mode == "header":
+            region_words = extract_page_words(page_height * self.title_region_ratio)
+            candidates = self._build_candidates(region_words, header_height)
+            if candidates:
+                return candidates
+        
+        text_elements = extract_page_words()
+        
+        if not text_elements:
+            return [("未能识别标题", 0.0)]
+        
+        candidates = self._build_candidates(text_elements, header_height)
+        if not candidates:
+            return [("未能识别合适的标题", 0.0)]
+        
+        return candidates
+    
+    def _extract_words(self, page) -> List[Dict]:
+        """提取带有字体大小、位置等属性的单词"""
+        return page.extract_words(**WORD_EXTRACTION_OPTIONS)
+    
+    def _extract_region_words(self, page, region_height: float) -> List[Dict]:
+        """
+        只提取页面顶部region_height范围内的单词
+        直接遍历pdfminer的版面对象，区域外的字符不会转换为pdfplumber的字典，
+        省去整页对象解析的大部分开销
+        """
+        from pdfplumber.utils import extract_words
+        from core.pdfminer_backend import iter_layout_chars
+        min_y0 = page.height - region_height
+        chars = [
+            page.process_object(obj)
+            for obj in iter_layout_chars(page.layout._objs)
+            if obj.y0 >= min_y0
+        ]
+        return extract_words(chars, **WORD_EXTRACTION_OPTIONS)
+    
+    def _build_candidates(self, text_elements: List[Dict], header_height: float) -> List[Tuple[str, float]]:
+        """
+        根据字体大小从文本元素中构建候选标题列表
+        没有合适的文本元素时返回空列表
+        """
+        # 过滤掉页眉区域的文本和数字页码
+        start = time.perf_counter()
+        filtered_elements = [
+            elem for elem in text_elements
+            if not (elem['top'] < header_height or  # 不在页眉区域
+                elem['text'].isdigit() or  # 不是纯数字
+                len(elem['text'].strip()) < self.min_title_length)  # 不是过短的文本
+        ]
+        self._report_stage("header_filter", start, len(filtered_elements))
+        
+        if not filtered_elements:
+            return []
+        
+        # 找出最大字体大小
+        start = time.perf_counter()
+        max_font_size = max(elem['size'] for elem in filtered_elements)
+        
+        # 获取接近最大字体大小的元素（考虑字体差异范围）
+        large_font_elements = [
+            elem for elem in filtered_elements 
+            if max_font_size - elem['size'] <= self.font_size_threshold
+        ]
+        
+        # 按垂直位置和水平位置排序，以保持阅读顺序
+        sorted_elements = sorted(
+            large_font_elements,
+            key=lambda x: (x['top'], x['x0'])
+        )
+        self._report_stage("max_font", start, len(sorted_elements))
+        
+        # 构建候选标题列表
+        candidates = []
+        
+        # 1. 提取最大字体的标题
+        max_font_title = self._join_text_elements(sorted_elements)
+        candidates.append((max_font_title, max_font_size))
+        
+        # 2. 尝试按行分组，提取可能的标题（处理多行标题）
+        start = time.perf_counter()
+        line_groups = self._group_elements_by_line(sorted_elements)
+        self._report_stage("group_lines", start, len(line_groups))
+        if len(line_groups) > 1:
+            # 如果有多行，尝试使用第一行作为候选标题
+            first_line = self._join_text_elements(line_groups[0])
+            if first_line != max_font_title:
+                avg_size = sum(elem['size'] for elem in line_groups[0]) / len(line_groups[0])
+                candidates.append((first_line, avg_size))
+        
+        # 3. 如果还是没有好的候选项，尝试其他次大字体大小
+        if len(candidates) < 2:
+            start = time.perf_counter()
+            # 次大字体即小于最大字体的字体中最大的一个，一次遍历求出，无需对全部字体大小去重排序
+            second_size = max(
+                (elem['size'] for elem in filtered_elements if elem['size'] < max_font_size),
+                default=None
+            )
+            if second_size is not None:
+                second_elements = [elem for elem in filtered_elements if elem['size'] == second_size]
+                second_sorted = sorted(second_elements, key=lambda x: (x['top'], x['x0']))
+                self._report_stage("second_size", start, len(second_sorted))
+                second_title = self._join_text_elements(second_sorted)
+                candidates.append((second_title, second_size))
+        
+        return candidates
+    
+    def create_executor(self, max_workers: Optional[int] = None,
+                        prestart: bool = False) -> 'SupervisedPool':
+        """
+        创建加载了当前提取器配置、受时间和内存上限监控的进程池，可传给extract_batch重复使用，
+        长时间运行时避免每批都重新启动工作进程（之后修改的提取参数不会同步到工作进程）
+        prestart为True时立即启动全部工作进程
+        """
+        from core.supervisor import SupervisedPool
+        return SupervisedPool(
+            self,
+            max_workers=max_workers or self.max_workers,
+            task_timeout=self.task_timeout,
+            memory_limit_mb=self.memory_limit_mb,
+            prestart=prestart
+        )
+    
+    def extract_batch(self, pdf_paths: Iterable[str],
+                      max_workers: Optional[int] = None,
+                      executor: Optional['SupervisedPool'] = None) -> Iterator[ExtractionResult]:
+        """
+        使用多进程批量提取标题候选，按完成顺序逐个返回结果
+        pdfplumber的版面分析受GIL限制，因此使用进程池而不是线程池
+        executor：由create_executor创建的进程池，为None时本次调用单独创建并在结束时关闭
+        超时、内存超限或工作进程崩溃的文件返回出错结果，原因记录在error字段中
+        detect_duplicates为True时，只对缓存未命中的文件计算内容指纹，边计算边提交任务，
+        内容相同的副本在被提取的文件得到结果后返回，duplicate_of记录该文件
+        设置了metrics时，每个文件的结果按来源（工作进程、缓存、重复文件）记录到指标中
+        """
+        pdf_paths = list(pdf_paths)
+        if self.metrics is not None:
+            self.metrics.add_planned(len(pdf_paths))
+        # 先在主进程中查询缓存，命中的文件直接返回，不计算指纹，也不再分发给工作进程
+        pdf_paths = yield from self._cached_results(pdf_paths)
+        if not pdf_paths:
+            return
+        
+        duplicates = None
+        if self.detect_duplicates:
+            from core.fingerprint import DuplicateIndex
+            duplicates = DuplicateIndex()
+        
+        owned_executor = executor is None
+        if owned_executor:
+            workers = max_workers or self.max_workers or os.cpu_count() or 1
+            workers = min(workers, len(pdf_paths))
+            
+            # 只有一个文件或一个工作进程时直接在当前进程处理，省去进程启动开销；
+            # 设置了时间或内存上限时仍需在工作进程中处理才能中止，只有阶段计时需要在当前进程中进行
+            no_budget = self.task_timeout is None and not self.memory_limit_mb
+            if workers <= 1 and (no_budget or self.stage_callback is not None):
+                yield from self._extract_sequential(pdf_paths, duplicates)
+                return
+            executor = self.create_executor(workers)
+        try:
+            yield from self._extract_in_pool(pdf_paths, executor, duplicates)
+        finally:
+            # 调用方提前结束迭代时，取消尚未开始的任务
+            if owned_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _observe(self, result: ExtractionResult, source: str):
+        """将批量提取的结果记录到指标中（source见core.metrics中的SOURCE_*）"""
+        if self.metrics is not None:
+            self.metrics.observe_extraction(result, source)
+    
+    def _cached_results(self, pdf_paths: List[str]):
+        """返回缓存命中的结果（生成器），生成器的返回值为未命中的文件列表"""
+        if self.cache is None:
+            return pdf_paths
+        settings = self.settings_key()
+        misses = []
+        for pdf_path in pdf_paths:
+            start = time.perf_counter()
+            cached = self.cache.get(pdf_path, settings)
+            if cached is None:
+                misses.append(pdf_path)
+            else:
+                result = ExtractionResult(pdf_path, cached, time.perf_counter() - start)
+                self._observe(result, "cache")
+                yield result
+        return misses
+    
+    def _copy_result(self, result: ExtractionResult, copy_path: str) -> ExtractionResult:
+        """内容相同的副本复用已提取文件的结果"""
+        self._store_in_cache(copy_path, result.candidates)
+        copy_result = result._replace(path=copy_path, elapsed=0.0, duplicate_of=result.path)
+        self._observe(copy_result, "duplicate")
+        return copy_result
+    
+    def _extract_sequential(self, pdf_paths: List[str], duplicates) -> Iterator[ExtractionResult]:
+        """在当前进程中逐个提取；duplicates为DuplicateIndex，为None时不查找重复文件"""
+        if self.metrics is not None:
+            self.metrics.set_workers(1)
+        finished: Dict[str, ExtractionResult] = {}  # 已提取的文件 -> 结果（供之后出现的副本复用）
+        for pdf_path in pdf_paths:
+            original = duplicates.add(pdf_path) if duplicates is not None else None
+            if original is not None:
+                yield self._copy_result(finished[original], pdf_path)
+                continue
+            start = time.perf_counter()
+            candidates = self._extract_title_candidates(pdf_path)
+            self._store_in_cache(pdf_path, candidates)
+            result = ExtractionResult(pdf_path, candidates, time.perf_counter() - start)
+            self._observe(result, "worker")
+            if duplicates is not None:
+                finished[pdf_path] = result
+            yield result
+    
+    def _extract_in_pool(self, pdf_paths: List[str], executor: 'SupervisedPool',
+                         duplicates) -> Iterator[ExtractionResult]:
+        """
+        逐个计算指纹并提交到进程池，提交期间随时返回已完成的结果，不必等全部指纹计算完成
+        duplicates为DuplicateIndex，为None时不查找重复文件
+        """
+        if self.metrics is not None:
+            self.metrics.set_workers(executor.max_workers)
+        done: queue.Queue = queue.Queue()  # 已完成的Future，由完成回调放入
+        futures: Dict[Future, str] = {}
+        finished: Dict[str, ExtractionResult] = {}  # 已提取的文件 -> 结果
+        waiting: Dict[str, List[str]] = {}  # 尚未得到结果的文件 -> 其副本
+        handled = 0
+        
+        def handle(future: Future) -> Iterator[ExtractionResult]:
+            pdf_path = futures[future]
+            try:
+                result = future.result()
+                self._store_in_cache(result.path, result.candidates)
+            except Exception as e:
+                # 任务被取消等情况，与单文件提取保持相同的错误返回格式
+                result = ExtractionResult(pdf_path, [(f"{ERROR_TITLE_PREFIX}: {str(e)}", 0.0)],
+                                          0.0, str(e) or type(e).__name__)
+            self._observe(result, "worker")
+            yield result
+            if duplicates is not None:
+                finished[pdf_path] = result
+                for copy_path in waiting.pop(pdf_path, ()):
+                    yield self._copy_result(result, copy_path)
+        
+        try:
+            for pdf_path in pdf_paths:
+                original = duplicates.add(pdf_path) if duplicates is not None else None
+                if original is None:
+                    future = executor.submit(pdf_path)
+                    futures[future] = pdf_path
+                    future.add_done_callback(done.put)
+                elif original in finished:
+                    yield self._copy_result(finished[original], pdf_path)
+                else:
+                    waiting.setdefault(original, []).append(pdf_path)
+                while not done.empty():
+                    handled += 1
+                    yield from handle(done.get_nowait())
+            while handled < len(futures):
+                handled += 1
+                yield from handle(done.get())
+        finally:
+            for future in futures:
+                future.cancel()
     
     def _join_text_elements(self, elements: List[Dict]) -> str:
         """智能连接文本元素，处理中英文混合情况"""
         if not elements:
             return ""
         
+        start = time.perf_counter()
         # 按顺序连接文本
         texts = [elem['text'] for elem in elements]
         
         # 处理中英文连接
-        result = ""
-        for i, text in enumerate(texts):
-            if i > 0:
-                # 检查是否需要添加空格（避免中文之间、中英文之间不必要的空格）
-                prev_char = texts[i-1][-1] if texts[i-1] else ""
-                curr_char = text[0] if text else ""
-                
-                # 如果前一个字符是西文且当前字符也是西文，添加空格
-                if (self._is_western_char(prev_char) and self._is_western_char(curr_char)):
-                    result += " "
+        parts = [texts[0]]
+        for prev_text, text in zip(texts, texts[1:]):
+            # 检查是否需要添加空格（避免中文之间、中英文之间不必要的空格）
+            prev_char = prev_text[-1] if prev_text else ""
+            curr_char = text[0] if text else ""
             
-            result += text
+            # 如果前一个字符是西文且当前字符也是西文，添加空格
+            if is_western_char(prev_char) and is_western_char(curr_char):
+                parts.append(" ")
+            parts.append(text)
+        result = "".join(parts)
                 
+        self._report_stage("join_text", start, len(elements))
         return result.strip()
     
     def _is_western_char(self, char: str) -> bool:
         """判断字符是否是西文字符（英文、数字、西文标点等）"""
-        if not char:
-            return False
-        # 使用Unicode类别判断
-        category = unicodedata.category(char)
-        # 大部分西文字符属于Latin类别或标点、数字等
-        return ('L' in category and not unicodedata.name(char, "").startswith('CJK')) or \
-               category.startswith('P') or category.startswith('N')
+        return is_western_char(char)
     
     def _group_elements_by_line(self, elements: List[Dict]) -> List[List[Dict]]:
         """将文本元素按行分组"""
@@ -148,7 +616,7 @@ class PDFTitleExtractor:
         # 根据垂直位置的接近程度分组
         for elem in sorted_by_top[1:]:
             # 如果垂直位置接近当前行，认为是同一行
-            if abs(elem['top'] - current_top) <= 5:  # 5点的容差
+            if abs(elem['top'] - current_top) <= LINE_TOLERANCE:
                 current_line.append(elem)
             else:
                 # 开始新行
@@ -169,26 +637,32 @@ class PDFTitleExtractor:
         # 获取原文件名（不含扩展名）
         original_name_without_ext = os.path.splitext(original_filename)[0]
         
-        # 清理标题中的非法字符
-        clean_title = self._clean_filename(title)
-        
-        # 控制长度
-        max_length = 100
-        if len(clean_title) > max_length:
-            clean_title = clean_title[:max_length]
+        # 清理标题中的非法字符，并控制长度
+        clean_title = self._clean_filename(title)[:MAX_TITLE_LENGTH]
         
         # 组合新文件名（保留原文件名）
         new_filename = f"{clean_title}_{original_name_without_ext}.pdf"
         return new_filename
     
+    def process_filenames(self, items: Iterable[Tuple[str, str]]) -> List[str]:
+        """
+        批量处理文件名：items为 (标题, 原文件名) 序列，按顺序返回新文件名，
+        结果与逐个调用process_filename相同（批量预览、批量重命名规划时使用）
+        """
+        clean = self._clean_filename
+        splitext = os.path.splitext
+        return [
+            f"{clean(title)[:MAX_TITLE_LENGTH]}_{splitext(original_filename)[0]}.pdf"
+            for title, original_filename in items
+        ]
+    
     def _clean_filename(self, filename: str) -> str:
         """
         清理文件名中的非法字符
         """
         # 替换Windows文件名中的非法字符
-        illegal_chars = r'[\\/*?:"<>|]'
-        clean_name = re.sub(illegal_chars, "", filename)
+        clean_name = ILLEGAL_FILENAME_CHARS.sub("", filename)
         # 替换连续的空格和点
-        clean_name = re.sub(r'\s+', " ", clean_name)
-        clean_name = re.sub(r'\.+', ".", clean_name)
-        return clean_name.strip('. ')
\ No newline at end of file
+        clean_name = WHITESPACE_RUN.sub(" ", clean_name)
+        clean_name = DOT_RUN.sub(".", clean_name)
+        return clean_name.strip('. ')
@@ -0,0 +1,184 @@
+"""
+基于pdfminer字符流的第一页单词提取后端
+直接遍历pdfminer的LTChar对象，在一次遍历中完成单词切分，
+不经过pdfplumber为每个字符构建完整属性字典的过程。
+单词切分规则与pdfplumber的 extract_words(use_text_flow=True, keep_blank_chars=True,
+x_tolerance=3, y_tolerance=3, extra_attrs=['size', 'top', 'fontname']) 保持一致，
+因此得到的 (文本, 字体大小) 候选与pdfplumber路径相同。
+"""
+import time
+import xml.etree.ElementTree as ElementTree
+from typing import Callable, Dict, Iterator, List, Optional
+
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LTChar, LTContainer, LTPage
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+from pdfminer.utils import decode_text
+
+# 与pdfplumber默认一致的连字展开表
+LIGATURES = {
+    "ﬀ": "ff",
+    "ﬃ": "ffi",
+    "ﬄ": "ffl",
+    "ﬁ": "fi",
+    "ﬂ": "fl",
+    "ﬆ": "st",
+    "ﬅ": "st",
+}
+
+X_TOLERANCE = 3
+Y_TOLERANCE = 3
+
+# XMP元数据中的命名空间
+XMP_DC_TITLE = "{http://purl.org/dc/elements/1.1/}title"
+XMP_RDF_LI = "{http://www.w3.org/1999/02/22-rdf-syntax-ns#}li"
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+
+def iter_layout_chars(layout_objects) -> Iterator[LTChar]:
+    """按内容流顺序遍历版面对象中的字符（包括图形容器内的字符）"""
+    for obj in layout_objects:
+        if isinstance(obj, LTContainer):
+            yield from iter_layout_chars(obj._objs)
+        elif isinstance(obj, LTChar):
+            yield obj
+
+
+class FirstPageChars:
+    """PDF第一页的字符流，只保留单词切分所需的信息"""
+
+    def __init__(self, layout: LTPage):
+        self.height = layout.height
+        self.width = layout.width
+        self._layout = layout
+
+    def extract_words(self, region_height: Optional[float] = None) -> List[Dict]:
+        """
+        将字符流切分为单词，返回包含text、size、top、x0的字典列表
+        region_height不为None时只处理页面顶部该高度范围内的字符
+        """
+        height = self.height
+        min_y0 = height - region_height if region_height is not None else None
+
+        words = []
+        word_text = []
+        word_key = None
+        word_x0 = word_top = 0.0
+        prev = None  # 上一个字符的 (x0, x1, top, bottom)
+
+        for char in iter_layout_chars(self._layout._objs):
+            if min_y0 is not None and char.y0 < min_y0:
+                continue
+
+            top = height - char.y1
+            fontname = char.fontname
+            if isinstance(fontname, bytes):
+                fontname = fontname.decode("utf-8", "replace")
+            key = (char.upright, char.size, top, fontname)
+            current = (char.x0, char.x1, top, height - char.y0)
+
+            # 属性不同的字符不属于同一单词；属性相同时按间距判断
+            if word_text and (key != word_key or _begins_new_word(char.upright, prev, current)):
+                words.append(_make_word(word_text, word_key[1], word_top, word_x0))
+                word_text = []
+
+            text = char.get_text()
+            if not word_text:
+                word_key = key
+                word_x0 = char.x0
+                word_top = top
+            else:
+                word_x0 = min(word_x0, char.x0)
+            word_text.append(LIGATURES.get(text, text))
+            prev = current
+
+        if word_text:
+            words.append(_make_word(word_text, word_key[1], word_top, word_x0))
+        return words
+
+
+def _begins_new_word(upright: bool, prev: tuple, current: tuple) -> bool:
+    """与pdfplumber的WordExtractor.char_begins_new_word规则一致（从左到右、从上到下）"""
+    prev_x0, prev_x1, prev_top, prev_bottom = prev
+    x0, _, top, _ = current
+    if upright:
+        return x0 < prev_x0 or x0 > prev_x1 + X_TOLERANCE or top > prev_top + Y_TOLERANCE
+    # 竖排文字：行内方向为纵向，行间方向为横向
+    return top < prev_top or top > prev_bottom + Y_TOLERANCE or x0 > prev_x0 + X_TOLERANCE
+
+
+def _make_word(texts: List[str], size: float, top: float, x0: float) -> Dict:
+    return {'text': "".join(texts), 'size': size, 'top': top, 'x0': x0}
+
+
+def load_first_page(pdf_path: str,
+                    report_stage: Optional[Callable[[str, float, int], None]] = None
+                    ) -> Optional[FirstPageChars]:
+    """
+    解析PDF第一页的内容流，PDF没有页面时返回None
+    report_stage(阶段名, 开始时间, 元素数量)：可选的阶段计时回调
+    """
+    start = time.perf_counter()
+    with open(pdf_path, 'rb') as f:
+        parser = PDFParser(f)
+        document = PDFDocument(parser)
+        page = next(PDFPage.create_pages(document), None)
+        if report_stage:
+            report_stage("open", start, 0)
+        if page is None:
+            return None
+        start = time.perf_counter()
+        rsrcmgr = PDFResourceManager()
+        device = PDFPageAggregator(rsrcmgr, pageno=1, laparams=None)
+        interpreter = PDFPageInterpreter(rsrcmgr, device)
+        interpreter.process_page(page)
+        layout = device.get_result()
+        if report_stage:
+            report_stage("load_page", start, len(layout._objs))
+        return FirstPageChars(layout)
+
+
+def _xmp_titles(document: PDFDocument) -> List[str]:
+    """XMP元数据中的dc:title，默认语言（x-default）的标题在前"""
+    metadata = resolve1(document.catalog.get("Metadata"))
+    if metadata is None or not hasattr(metadata, "get_data"):
+        return []
+    try:
+        root = ElementTree.fromstring(metadata.get_data())
+    except ElementTree.ParseError:
+        return []
+    titles = []
+    for title in root.iter(XMP_DC_TITLE):
+        for item in title.iter(XMP_RDF_LI):
+            if item.text and item.text.strip():
+                if item.get(XML_LANG) == "x-default":
+                    titles.insert(0, item.text)
+                else:
+                    titles.append(item.text)
+    return titles
+
+
+def _info_titles(document: PDFDocument) -> List[str]:
+    """文档信息字典中的/Title"""
+    titles = []
+    for info in document.info:
+        title = resolve1(info.get("Title"))
+        if isinstance(title, bytes):
+            title = decode_text(title)
+        if isinstance(title, str) and title.strip():
+            titles.append(title)
+    return titles
+
+
+def read_metadata_titles(pdf_path: str) -> List[str]:
+    """
+    读取文档元数据中的标题，不解析任何页面内容
+    返回：XMP dc:title 在前、文档信息字典 /Title 在后的标题列表
+    """
+    with open(pdf_path, 'rb') as f:
+        document = PDFDocument(PDFParser(f))
+        return _xmp_titles(document) + _info_titles(document)
@@ -0,0 +1,109 @@
+import os
+import threading
+from typing import Callable, Dict, Optional, Set, Tuple
+
+
+def unique_path(path: str) -> str:
+    """目标文件已存在时，在文件名后追加 _1、_2 …… 直到不冲突"""
+    if not os.path.exists(path):
+        return path
+    base, ext = os.path.splitext(path)
+    counter = 1
+    new_path = f"{base}_{counter}{ext}"
+    while os.path.exists(new_path):
+        counter += 1
+        new_path = f"{base}_{counter}{ext}"
+    return new_path
+
+
+class DirectoryNameIndex:
+    """
+    目录中已占用文件名的内存索引，用于批量重命名时分配不冲突的文件名
+    每个目录在第一次用到时用一次scandir读取全部文件名，之后随重命名更新，
+    分配文件名时不再逐个检查文件是否存在（网络共享目录上每次检查都是一次往返）。
+    只适用于本次处理期间没有其他程序在同一目录中创建同名文件的情况。
+    可在多个线程中同时使用。
+    """
+
+    def __init__(self):
+        self._names: Dict[str, Set[str]] = {}  # 目录 -> 已占用的文件名（normcase后）
+        # (目录, 文件名主干, 扩展名) -> 下一个尝试的编号，同一标题的大量文件无需每次从1开始
+        self._next_counter: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def _names_in(self, directory: str) -> Set[str]:
+        names = self._names.get(directory)
+        if names is None:
+            try:
+                with os.scandir(directory) as entries:
+                    names = {os.path.normcase(entry.name) for entry in entries}
+            except OSError:
+                names = set()
+            self._names[directory] = names
+        return names
+
+    def add(self, path: str):
+        """记录由其他途径出现在目录中的文件"""
+        directory, name = os.path.split(path)
+        with self._lock:
+            self._names_in(directory).add(os.path.normcase(name))
+
+    def claim(self, path: str) -> str:
+        """分配一个不冲突的路径（规则与unique_path相同）并立即占用"""
+        directory, name = os.path.split(path)
+        with self._lock:
+            names = self._names_in(directory)
+            key = os.path.normcase(name)
+            if key not in names:
+                names.add(key)
+                return path
+            base, ext = os.path.splitext(name)
+            counter_key = (directory, base, ext)
+            counter = self._next_counter.get(counter_key, 1)
+            while os.path.normcase(f"{base}_{counter}{ext}") in names:
+                counter += 1
+            self._next_counter[counter_key] = counter + 1
+            new_name = f"{base}_{counter}{ext}"
+            names.add(os.path.normcase(new_name))
+            return os.path.join(directory, new_name)
+
+    def release(self, path: str):
+        """释放文件名（重命名失败时释放分配的新名称，重命名成功后释放原名称）"""
+        directory, name = os.path.split(path)
+        with self._lock:
+            names = self._names.get(directory)
+            if names is not None:
+                names.discard(os.path.normcase(name))
+
+
+def rename_with_title(extractor, file_path: str, title: str, dry_run: bool = False,
+                      journal=None, name_index: DirectoryNameIndex = None,
+                      on_target: Optional[Callable[[str], None]] = None) -> str:
+    """
+    按标题重命名文件，自动避开同名文件
+    journal：重命名日志批次（core.journal.JournalBatch），为None时不记录
+    name_index：目录文件名索引，为None时逐个检查文件是否存在
+    on_target(new_path)：确定新文件名后、实际重命名之前调用（监视模式据此忽略自己产生的文件事件）
+    返回：新文件的完整路径
+    """
+    new_filename = extractor.process_filename(title, os.path.basename(file_path))
+    target = os.path.join(os.path.dirname(file_path), new_filename)
+    if name_index is None:
+        new_path = unique_path(target)
+    else:
+        new_path = name_index.claim(target)
+    if not dry_run:
+        if on_target is not None and new_path != file_path:
+            on_target(new_path)
+        try:
+            if journal is not None:
+                journal.rename(file_path, new_path)
+            else:
+                os.rename(file_path, new_path)
+        except OSError:
+            if name_index is not None:
+                name_index.release(new_path)
+            raise
+        if name_index is not None:
+            name_index.release(file_path)
+    return new_path
@@ -0,0 +1,254 @@
+"""
+本地HTTP标题提取服务
+常驻运行，工作进程在启动时创建并一直保留（已导入pdfplumber等依赖），多个客户端共用同一个进程池，
+省去每次调用启动解释器和导入依赖的开销。
+接口（返回JSON）：
+    GET  /health    服务状态
+    POST /extract   单个文件：JSON {"path": 路径}，或请求体为PDF内容（?filename=原文件名）
+    POST /batch     多个文件：JSON {"paths": [路径...]}，或multipart/form-data上传多个文件
+每个文件的结果包含 path（上传的文件为filename）、candidates、chosen_name、elapsed、status，失败时另有error。
+"""
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import email.parser
+import email.policy
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from core.pdf_processor import ExtractionResult, PDFTitleExtractor, has_usable_title
+from core.supervisor import failed_result
+
+# 请求体大小上限（MB）
+DEFAULT_MAX_BODY_MB = 200
+
+
+class RequestError(Exception):
+    """请求格式错误，返回400"""
+
+
+class ExtractionService:
+    """
+    提取服务：持有常驻的进程池，路径请求经过提取器的缓存和重复文件检测，
+    上传的文件写入临时文件后直接交给进程池处理（不写入缓存）
+    """
+
+    def __init__(self, extractor: PDFTitleExtractor, workers: Optional[int] = None):
+        self.extractor = extractor
+        self.executor = extractor.create_executor(workers, prestart=True)
+        self.workers = self.executor.max_workers
+        self.started = time.time()
+        self.requests = 0
+        self.files = 0
+        self._lock = threading.Lock()
+
+    def _record(self, result: ExtractionResult, filename: str, uploaded: bool = False) -> Dict:
+        """与命令行JSONL相同格式的单个文件结果，上传的文件以filename代替path"""
+        record = {
+            "filename" if uploaded else "path": filename if uploaded else result.path,
+            "candidates": [[text, size] for text, size in result.candidates],
+            "chosen_name": None,
+            "elapsed": round(result.elapsed, 4),
+            "status": "success",
+        }
+        if result.duplicate_of:
+            record["duplicate_of"] = result.duplicate_of
+        if has_usable_title(result.candidates):
+            record["chosen_name"] = self.extractor.process_filename(result.candidates[0][0], filename)
+        else:
+            record["status"] = "failed"
+            record["error"] = result.error or (result.candidates[0][0] if result.candidates
+                                               else "无法提取标题")
+        return record
+
+    def _count(self, files: int):
+        with self._lock:
+            self.requests += 1
+            self.files += files
+
+    def extract_paths(self, paths: List[str]) -> List[Dict]:
+        """提取服务器本地（或共享存储上）的文件，按请求顺序返回结果"""
+        self._count(len(paths))
+        paths = [os.path.abspath(path) for path in paths]
+        # 同一路径在请求中出现多次时只提取一次，结果按请求中的每个位置返回
+        results: Dict[str, ExtractionResult] = {}
+        for result in self.extractor.extract_batch(dict.fromkeys(paths), executor=self.executor):
+            results[result.path] = result
+        return [self._record(results[path], os.path.basename(path)) for path in paths]
+
+    def extract_uploads(self, uploads: List[Tuple[str, bytes]]) -> List[Dict]:
+        """提取上传的文件内容：uploads为 (原文件名, PDF内容) 列表，按上传顺序返回结果"""
+        self._count(len(uploads))
+        temp_dir = tempfile.mkdtemp(prefix="pdf_title_service_")
+        try:
+            futures: List[Tuple[str, str, Future]] = []
+            for index, (filename, content) in enumerate(uploads):
+                temp_path = os.path.join(temp_dir, f"{index}.pdf")
+                with open(temp_path, "wb") as f:
+                    f.write(content)
+                futures.append((filename, temp_path, self.executor.submit(temp_path)))
+            records = []
+            for filename, temp_path, future in futures:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = failed_result(temp_path, str(e) or type(e).__name__)
+                records.append(self._record(result, filename, uploaded=True))
+            return records
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def health(self) -> Dict:
+        with self._lock:
+            return {
+                "status": "ok",
+                "workers": self.workers,
+                "uptime": round(time.time() - self.started, 1),
+                "requests": self.requests,
+                "files": self.files,
+            }
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def parse_multipart(content_type: str, body: bytes) -> List[Tuple[str, bytes]]:
+    """解析multipart/form-data请求体，返回其中上传的文件 (文件名, 内容)"""
+    header = f"Content-Type: {content_type}\r\n\r\n".encode("latin-1")
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(header + body)
+    if not message.is_multipart():
+        raise RequestError("multipart请求格式错误")
+    uploads = []
+    for part in message.iter_parts():
+        filename = part.get_filename()
+        if filename:
+            uploads.append((os.path.basename(filename), part.get_payload(decode=True) or b""))
+    return uploads
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    server_version = "PDFTitleService/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self) -> ExtractionService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        # 访问记录由服务器的on_request回调输出
+        pass
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            raise RequestError("Content-Length无效")
+        if length < 0:
+            raise RequestError("Content-Length无效")
+        if length > self.server.max_body_bytes:
+            raise RequestError(f"请求体超过上限（{self.server.max_body_bytes // (1024 * 1024)}MB）")
+        return self.rfile.read(length)
+
+    def _handle(self, handler: Callable[[], Tuple[int, object]], files: Callable[[], int]):
+        start = time.perf_counter()
+        try:
+            status, payload = handler()
+        except RequestError as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": str(e) or type(e).__name__}
+        if status != 200:
+            # 请求体可能没有读完，不再复用该连接
+            self.close_connection = True
+        self._send_json(status, payload)
+        if self.server.on_request is not None:
+            self.server.on_request({
+                "method": self.command,
+                "path": self.path,
+                "status": status,
+                "files": files() if status == 200 else 0,
+                "elapsed": round(time.perf_counter() - start, 4),
+            })
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            self._handle(lambda: (200, self.service.health()), lambda: 0)
+        else:
+            self._handle(lambda: (404, {"error": "未知接口"}), lambda: 0)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        count = [0]
+
+        def extract():
+            if url.path not in ("/extract", "/batch"):
+                return 404, {"error": "未知接口"}
+            records = self._extract_request(url, single=url.path == "/extract")
+            count[0] = len(records)
+            if url.path == "/batch":
+                return 200, {"results": records}
+            return 200, records[0]
+
+        self._handle(extract, lambda: count[0])
+
+    def _extract_request(self, url, single: bool = False) -> List[Dict]:
+        """
+        按请求的Content-Type解析路径或上传的文件并提取
+        single为True时（/extract）在提取之前检查请求中只有一个文件
+        """
+
+        def check_count(count: int):
+            if single and count != 1:
+                raise RequestError("/extract 只接受一个文件，多个文件请使用 /batch")
+
+        body = self._read_body()
+        content_type = self.headers.get("Content-Type", "")
+        media_type = content_type.split(";")[0].strip().lower()
+        if media_type == "application/json":
+            try:
+                request = json.loads(body.decode("utf-8"))
+            except ValueError:
+                raise RequestError("JSON格式错误")
+            if not isinstance(request, dict):
+                raise RequestError("请求应为JSON对象")
+            paths = request.get("paths", [request["path"]] if "path" in request else None)
+            if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+                raise RequestError("请求中应包含 path 或 paths")
+            check_count(len(paths))
+            return self.service.extract_paths(paths)
+        if media_type == "multipart/form-data":
+            uploads = parse_multipart(content_type, body)
+            if not uploads:
+                raise RequestError("请求中没有上传文件")
+            check_count(len(uploads))
+            return self.service.extract_uploads(uploads)
+        if media_type in ("application/pdf", "application/octet-stream"):
+            filename = parse_qs(url.query).get("filename", ["upload.pdf"])[0]
+            return self.service.extract_uploads([(os.path.basename(filename), body)])
+        raise RequestError(f"不支持的Content-Type: {content_type or '（空）'}")
+
+
+class ExtractionServer(ThreadingHTTPServer):
+    """每个请求一个线程，所有请求共用ExtractionService的进程池"""
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: ExtractionService,
+                 max_body_mb: int = DEFAULT_MAX_BODY_MB,
+                 on_request: Optional[Callable[[Dict], None]] = None):
+        super().__init__(address, ServiceRequestHandler)
+        self.service = service
+        self.max_body_bytes = max_body_mb * 1024 * 1024
+        self.on_request = on_request
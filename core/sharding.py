@@ -0,0 +1,203 @@
+"""
+分片批量处理：多台机器（或多个本地进程）共同处理共享存储上的大量PDF
+1. manifest：列出全部PDF文件，写入清单
+2. shard：每个工作节点按路径哈希确定性地选出自己的分片，只提取标题，结果写入各自的结果文件
+3. merge：合并所有分片结果，统一分配不冲突的新文件名，生成重命名计划
+4. apply：按计划重命名（可再次分片并行执行）
+所有文件均为JSONL；分片结果和执行结果逐行写入，中断后重新运行同一命令会跳过已完成的文件。
+"""
+import os
+import json
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from core.pdf_processor import PDFTitleExtractor, has_usable_title
+from core.renamer import DirectoryNameIndex
+
+# 清单格式版本
+MANIFEST_VERSION = 1
+
+
+def shard_of(path: str, shard_count: int) -> int:
+    """路径所属的分片编号（0 ~ shard_count-1），在所有机器和Python进程中保持一致"""
+    return zlib.crc32(path.encode("utf-8", "surrogateescape")) % shard_count
+
+
+def shard_result_path(results_dir: str, shard_index: int, shard_count: int) -> str:
+    return os.path.join(results_dir, f"shard-{shard_index:05d}-of-{shard_count:05d}.jsonl")
+
+
+def _read_records(path: str) -> Iterator[Dict]:
+    """逐行读取JSONL文件，忽略中断时只写了一半的行"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+def _write_record(output, record: Dict):
+    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+    output.flush()
+
+
+def write_manifest(pdf_paths: Iterable[str], manifest_path: str) -> int:
+    """将PDF文件路径写入清单（第一行为清单信息，之后每行一个文件），返回文件数"""
+    count = 0
+    with open(manifest_path, "w", encoding="utf-8") as output:
+        output.write(json.dumps({"manifest": MANIFEST_VERSION}) + "\n")
+        for pdf_path in pdf_paths:
+            output.write(json.dumps({"path": pdf_path}, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def read_manifest(manifest_path: str) -> Iterator[str]:
+    """按清单中的顺序返回文件路径"""
+    for record in _read_records(manifest_path):
+        if "path" in record:
+            yield record["path"]
+
+
+def check_shard(shard_index: int, shard_count: int):
+    """分片编号或分片总数无效时抛出ValueError"""
+    if shard_count < 1:
+        raise ValueError(f"分片总数应大于0: {shard_count}")
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"分片编号应在0到{shard_count - 1}之间: {shard_index}")
+
+
+def select_shard(paths: Iterable[str], shard_index: int, shard_count: int) -> Iterator[str]:
+    """选出属于指定分片的路径"""
+    check_shard(shard_index, shard_count)
+    return (path for path in paths if shard_of(path, shard_count) == shard_index)
+
+
+def run_shard(extractor: PDFTitleExtractor, manifest_path: str, shard_index: int,
+              shard_count: int, results_dir: str, retry_failed: bool = False,
+              on_result: Optional[Callable[[Dict], None]] = None) -> Tuple[int, int]:
+    """
+    提取一个分片中所有文件的标题候选，结果追加写入该分片的结果文件
+    结果文件中已有记录的文件不再处理（中断后重新运行即可继续），
+    retry_failed为True时重新处理记录为失败的文件（合并时以最后一条记录为准）
+    返回：(本次处理的文件数, 其中失败的文件数)
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    result_path = shard_result_path(results_dir, shard_index, shard_count)
+    done: Set[str] = set()
+    if os.path.exists(result_path):
+        for record in _read_records(result_path):
+            if "path" not in record:
+                continue
+            if record.get("status") == "success" or not retry_failed:
+                done.add(record["path"])
+            else:
+                done.discard(record["path"])
+
+    pending = [path for path in select_shard(read_manifest(manifest_path), shard_index, shard_count)
+               if path not in done]
+    processed = failures = 0
+    with open(result_path, "a", encoding="utf-8") as output:
+        for result in extractor.extract_batch(pending):
+            record = {
+                "path": result.path,
+                "candidates": [[text, size] for text, size in result.candidates],
+                "elapsed": round(result.elapsed, 4),
+                "status": "success",
+            }
+            if result.duplicate_of:
+                record["duplicate_of"] = result.duplicate_of
+            if not has_usable_title(result.candidates):
+                record["status"] = "failed"
+                record["error"] = result.error or (result.candidates[0][0] if result.candidates
+                                                   else "无法提取标题")
+                failures += 1
+            _write_record(output, record)
+            processed += 1
+            if on_result is not None:
+                on_result(record)
+    return processed, failures
+
+
+def merge_results(extractor: PDFTitleExtractor, manifest_path: str, results_dir: str,
+                  shard_count: int, plan_path: str) -> Dict[str, int]:
+    """
+    合并所有分片的结果，按清单顺序生成重命名计划（新文件名统一分配，分片之间不会冲突）
+    计划每行：成功 {"path", "new_path", "title"}；失败或缺少结果 {"path", "status": "failed", "error"}
+    返回统计：planned（计划重命名）、failed（提取失败）、missing（没有结果）、
+    missing_shards（缺少结果文件的分片数）
+    """
+    stats = {"planned": 0, "failed": 0, "missing": 0, "missing_shards": 0}
+    results: Dict[str, Tuple[str, str]] = {}  # 路径 -> (标题, 错误信息)
+    for shard_index in range(shard_count):
+        result_path = shard_result_path(results_dir, shard_index, shard_count)
+        if not os.path.exists(result_path):
+            stats["missing_shards"] += 1
+            continue
+        for record in _read_records(result_path):
+            if record.get("status") == "success" and record.get("candidates"):
+                results[record["path"]] = (record["candidates"][0][0], "")
+            elif "path" in record:
+                results[record["path"]] = ("", record.get("error", "无法提取标题"))
+
+    name_index = DirectoryNameIndex()
+    with open(plan_path, "w", encoding="utf-8") as output:
+        for pdf_path in read_manifest(manifest_path):
+            title, error = results.get(pdf_path, ("", None))
+            if error is None:
+                stats["missing"] += 1
+                _write_record(output, {"path": pdf_path, "status": "failed",
+                                       "error": "分片结果中没有该文件"})
+            elif error:
+                stats["failed"] += 1
+                _write_record(output, {"path": pdf_path, "status": "failed", "error": error})
+            else:
+                new_filename = extractor.process_filename(title, os.path.basename(pdf_path))
+                new_path = name_index.claim(os.path.join(os.path.dirname(pdf_path), new_filename))
+                stats["planned"] += 1
+                _write_record(output, {"path": pdf_path, "new_path": new_path, "title": title})
+    return stats
+
+
+def read_plan(plan_path: str) -> Iterator[Tuple[str, str]]:
+    """返回计划中要重命名的 (原路径, 新路径)"""
+    for record in _read_records(plan_path):
+        if record.get("new_path"):
+            yield record["path"], record["new_path"]
+
+
+def apply_plan(plan_path: str, journal=None, dry_run: bool = False,
+               shard_index: int = 0, shard_count: int = 1) -> Iterator[Dict]:
+    """
+    按计划重命名（只处理属于指定分片的条目），逐个返回执行记录
+    已完成的重命名（原文件不存在、新文件已存在）记为skipped，可安全地重复执行；
+    目标文件已被其他文件占用时不覆盖，记为失败
+    journal：重命名日志批次（core.journal.JournalBatch），为None时不记录
+    """
+    check_shard(shard_index, shard_count)
+    for old_path, new_path in read_plan(plan_path):
+        if shard_of(old_path, shard_count) != shard_index:
+            continue
+        record = {"path": old_path, "new_path": new_path, "status": "success"}
+        if not os.path.exists(old_path):
+            if os.path.exists(new_path):
+                record["status"] = "skipped"
+            else:
+                record["status"] = "failed"
+                record["error"] = f"文件不存在: {old_path}"
+        elif os.path.exists(new_path):
+            record["status"] = "failed"
+            record["error"] = f"目标文件已存在: {new_path}"
+        elif not dry_run:
+            try:
+                if journal is not None:
+                    journal.rename(old_path, new_path)
+                else:
+                    os.rename(old_path, new_path)
+            except OSError as e:
+                record["status"] = "failed"
+                record["error"] = str(e)
+        yield record
@@ -0,0 +1,291 @@
+"""
+受监控的标题提取工作进程池
+每个文件有处理时间和内存上限：超时或内存超限的工作进程被立即终止并重新启动，
+该文件以失败结果（附带原因）返回，不会拖住整个批量处理。
+"""
+import os
+import sys
+import time
+import pickle
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, CancelledError
+from multiprocessing.connection import wait as wait_connections
+from typing import Deque, List, Optional, Tuple
+
+from core.pdf_processor import ERROR_TITLE_PREFIX, ExtractionResult, preload_parsing_stack
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 检查工作进程内存占用的间隔（秒）
+RSS_CHECK_INTERVAL = 0.5
+
+
+def _set_memory_limit(memory_limit_mb: Optional[int]):
+    """限制工作进程的地址空间，超出时分配内存失败（MemoryError），而不是拖垮整个系统"""
+    if not memory_limit_mb or resource is None or not hasattr(resource, "RLIMIT_AS"):
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def _worker_main(conn, extractor_state: bytes, memory_limit_mb: Optional[int]):
+    """工作进程：逐个接收文件路径，返回 (ExtractionResult, 是否需要重启)"""
+    # 通过pickle传递提取器，保证缓存连接等不可跨进程共享的属性在任何启动方式下都不会带入子进程
+    extractor = pickle.loads(extractor_state)
+    # 内存不足时由本进程报告并退出，不作为文件的提取结果
+    extractor.raise_memory_errors = True
+    _set_memory_limit(memory_limit_mb)
+    # 启动后立即导入解析依赖，等待任务期间完成导入
+    try:
+        preload_parsing_stack()
+    except ImportError:
+        # 缺少依赖时由每个文件的提取结果报告错误
+        pass
+    while True:
+        try:
+            pdf_path = conn.recv()
+        except (EOFError, OSError):
+            break
+        if pdf_path is None:
+            break
+        start = time.perf_counter()
+        try:
+            candidates = extractor.extract_title_candidates(pdf_path)
+            conn.send((ExtractionResult(pdf_path, candidates, time.perf_counter() - start), False))
+        except MemoryError:
+            # 内存分配失败后进程状态不可靠，报告后退出，由进程池重新启动
+            reason = f"内存超出限制（{memory_limit_mb}MB）"
+            conn.send((failed_result(pdf_path, reason, time.perf_counter() - start), True))
+            break
+
+
+def failed_result(pdf_path: str, reason: str, elapsed: float = 0.0) -> ExtractionResult:
+    """与单文件提取相同格式的出错结果，并在error字段中记录原因"""
+    return ExtractionResult(pdf_path, [(f"{ERROR_TITLE_PREFIX}: {reason}", 0.0)], elapsed, reason)
+
+
+def _process_rss_mb(pid: int) -> Optional[float]:
+    """读取进程当前的常驻内存（仅Linux），无法读取时返回None"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class _WorkerSlot:
+    """一个工作进程及其当前任务"""
+
+    def __init__(self, context, extractor_state: bytes, memory_limit_mb: Optional[int]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, extractor_state, memory_limit_mb),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.future: Optional[Future] = None
+        self.pdf_path = ""
+        self.started = 0.0
+
+    def assign(self, future: Future, pdf_path: str):
+        self.future = future
+        self.pdf_path = pdf_path
+        self.started = time.monotonic()
+        self.conn.send(pdf_path)
+
+    def finish(self, result: ExtractionResult):
+        future, self.future = self.future, None
+        if not future.done():
+            future.set_result(result)
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+
+
+class SupervisedPool:
+    """
+    标题提取进程池：submit(路径) 返回Future，结果为ExtractionResult
+    task_timeout：单个文件的处理时间上限（秒），None表示不限制
+    memory_limit_mb：单个工作进程的内存上限（MB），None表示不限制；
+    Unix上同时限制地址空间，Linux上另外定时检查常驻内存
+    prestart：创建时立即启动全部工作进程（常驻服务使用，第一个请求无需等待进程启动和导入）
+    """
+
+    def __init__(self, extractor, max_workers: Optional[int] = None,
+                 task_timeout: Optional[float] = None,
+                 memory_limit_mb: Optional[int] = None,
+                 prestart: bool = False):
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.task_timeout = task_timeout
+        self.memory_limit_mb = memory_limit_mb
+        self._extractor_state = pickle.dumps(extractor)
+        self._context = multiprocessing.get_context()
+
+        self._pending: Deque[Tuple[Future, str]] = deque()
+        self._slots: List[_WorkerSlot] = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._cancel_running = False
+        self._prestart = prestart
+        # 唤醒调度线程（有新任务或关闭时）
+        self._wakeup_reader, self._wakeup_writer = self._context.Pipe(duplex=False)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, pdf_path: str) -> Future:
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("进程池已关闭")
+            self._pending.append((future, pdf_path))
+        self._wakeup()
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        """
+        关闭进程池；cancel_futures为True时取消尚未开始的任务，
+        并立即终止正在处理的工作进程（其结果以CancelledError结束）
+        """
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                self._cancel_running = True
+                while self._pending:
+                    self._pending.popleft()[0].cancel()
+        self._wakeup()
+        if wait:
+            self._thread.join()
+
+    def _wakeup(self):
+        try:
+            self._wakeup_writer.send_bytes(b"\0")
+        except OSError:
+            pass
+
+    # ---------- 调度线程 ----------
+
+    def _replace(self, slot: _WorkerSlot, reason: Optional[str]):
+        """终止工作进程；reason不为None时以失败结果结束其当前任务"""
+        slot.kill()
+        if slot.future is not None and reason is not None:
+            elapsed = time.monotonic() - slot.started
+            slot.finish(failed_result(slot.pdf_path, reason, elapsed))
+        self._slots.remove(slot)
+
+    def _assign_pending(self):
+        with self._lock:
+            while self._pending:
+                idle = next((slot for slot in self._slots if slot.future is None), None)
+                if idle is None:
+                    if len(self._slots) >= self.max_workers:
+                        return
+                    idle = _WorkerSlot(self._context, self._extractor_state, self.memory_limit_mb)
+                    self._slots.append(idle)
+                future, pdf_path = self._pending.popleft()
+                # 已取消的任务直接跳过
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    idle.assign(future, pdf_path)
+                except OSError:
+                    self._replace(idle, "工作进程异常退出")
+
+    def _receive(self, slot: _WorkerSlot):
+        try:
+            result, recycle = slot.conn.recv()
+        except (EOFError, OSError):
+            # 工作进程崩溃或被系统终止（例如内存耗尽）
+            slot.process.join(timeout=1)
+            exitcode = slot.process.exitcode
+            self._replace(slot, f"工作进程异常退出（退出码 {exitcode}）" if exitcode is not None
+                          else "工作进程异常退出")
+            return
+        slot.finish(result)
+        if recycle:
+            self._replace(slot, None)
+
+    def _check_budgets(self):
+        now = time.monotonic()
+        for slot in list(self._slots):
+            if slot.future is None:
+                continue
+            if self.task_timeout is not None and now - slot.started > self.task_timeout:
+                self._replace(slot, f"处理超时（超过{self.task_timeout:g}秒）")
+                continue
+            if self.memory_limit_mb and sys.platform.startswith("linux"):
+                rss = _process_rss_mb(slot.process.pid)
+                if rss is not None and rss > self.memory_limit_mb:
+                    self._replace(slot, f"内存超出限制（{rss:.0f}MB > {self.memory_limit_mb}MB）")
+
+    def _next_wait_timeout(self) -> Optional[float]:
+        busy = [slot for slot in self._slots if slot.future is not None]
+        if not busy:
+            return None
+        timeout = RSS_CHECK_INTERVAL if self.memory_limit_mb else None
+        if self.task_timeout is not None:
+            now = time.monotonic()
+            remaining = min(slot.started + self.task_timeout - now for slot in busy)
+            remaining = max(0.0, remaining) + 0.01
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def _run(self):
+        try:
+            if self._prestart:
+                while len(self._slots) < self.max_workers:
+                    self._slots.append(_WorkerSlot(self._context, self._extractor_state, self.memory_limit_mb))
+            while True:
+                with self._lock:
+                    shutdown = self._shutdown
+                    cancel_running = self._cancel_running
+                if cancel_running:
+                    for slot in list(self._slots):
+                        if slot.future is not None:
+                            slot.future.set_exception(CancelledError())
+                            slot.future = None
+                        self._replace(slot, None)
+                    break
+                self._assign_pending()
+                busy = [slot for slot in self._slots if slot.future is not None]
+                if shutdown and not busy and not self._pending:
+                    break
+
+                ready = wait_connections([self._wakeup_reader] + [slot.conn for slot in busy],
+                                         timeout=self._next_wait_timeout())
+                for conn in ready:
+                    if conn is self._wakeup_reader:
+                        while self._wakeup_reader.poll():
+                            self._wakeup_reader.recv_bytes()
+                        continue
+                    slot = next(slot for slot in busy if slot.conn is conn)
+                    self._receive(slot)
+                self._check_budgets()
+        finally:
+            for slot in list(self._slots):
+                slot.stop()
+            self._slots.clear()
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import List, Optional, Tuple
+
+# 缓存格式版本，标题提取算法变化时递增以使旧缓存失效
+CACHE_VERSION = 1
+
+
+def default_cache_dir() -> str:
+    """获取默认的应用数据目录"""
+    return os.path.join(os.path.expanduser("~"), ".pdf_title_extractor")
+
+
+def file_content_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """流式计算文件内容的SHA-1哈希"""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TitleCache:
+    """
+    基于SQLite的标题候选持久化缓存
+    以(路径, 大小, 修改时间)作为文件标识；路径变化（如重命名）后，
+    仍可通过(设备, inode, 大小, 修改时间)命中
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = 50000,
+                 verify_hash: bool = False):
+        if db_path is None:
+            db_path = os.path.join(default_cache_dir(), "title_cache.sqlite3")
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.verify_hash = verify_hash  # 命中时是否再校验内容哈希
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                path TEXT NOT NULL,
+                settings TEXT NOT NULL,
+                device INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT,
+                candidates TEXT NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (path, settings)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_identity ON entries (device, inode, size, mtime_ns)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_access ON entries (last_access)")
+
+    def _settings_key(self, settings: str) -> str:
+        return f"v{CACHE_VERSION}|{settings}"
+
+    def get(self, pdf_path: str, settings: str = "") -> Optional[List[Tuple[str, float]]]:
+        """查询缓存，文件已变化或未命中时返回None"""
+        pdf_path = os.path.abspath(pdf_path)
+        try:
+            st = os.stat(pdf_path)
+        except OSError:
+            return None
+        settings = self._settings_key(settings)
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, size, mtime_ns, content_hash, candidates FROM entries "
+                "WHERE path = ? AND settings = ?",
+                (pdf_path, settings)
+            ).fetchone()
+            # 路径不匹配时按文件身份查找（文件被重命名或移动到同一文件系统内）
+            if row is None or row[1] != st.st_size or row[2] != st.st_mtime_ns:
+                if st.st_ino:
+                    row = self._conn.execute(
+                        "SELECT path, size, mtime_ns, content_hash, candidates FROM entries "
+                        "WHERE device = ? AND inode = ? AND size = ? AND mtime_ns = ? AND settings = ?",
+                        (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, settings)
+                    ).fetchone()
+                else:
+                    row = None
+            if row is None:
+                return None
+
+        cached_path, _, _, content_hash, candidates_json = row
+        if self.verify_hash and content_hash:
+            try:
+                if file_content_hash(pdf_path) != content_hash:
+                    return None
+            except OSError:
+                return None
+
+        with self._lock:
+            if cached_path != pdf_path:
+                # 记录新路径，后续按路径直接命中
+                self._conn.execute(
+                    "UPDATE OR REPLACE entries SET path = ?, last_access = ? "
+                    "WHERE path = ? AND settings = ?",
+                    (pdf_path, time.time(), cached_path, settings)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE entries SET last_access = ? WHERE path = ? AND settings = ?",
+                    (time.time(), pdf_path, settings)
+                )
+        return [(text, size) for text, size in json.loads(candidates_json)]
+
+    def put(self, pdf_path: str, candidates: List[Tuple[str, float]], settings: str = ""):
+        """写入缓存"""
+        pdf_path = os.path.abspath(pdf_path)
+        try:
+            st = os.stat(pdf_path)
+            content_hash = file_content_hash(pdf_path) if self.verify_hash else None
+        except OSError:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (pdf_path, self._settings_key(settings), st.st_dev, st.st_ino,
+                 st.st_size, st.st_mtime_ns, content_hash,
+                 json.dumps(candidates, ensure_ascii=False), time.time())
+            )
+            self._puts_since_evict += 1
+            # 每写入一定数量后检查一次容量，避免每次写入都计数
+            if self._puts_since_evict >= 500:
+                self._puts_since_evict = 0
+                self._evict()
+
+    def _evict(self):
+        """超出容量时按最近访问时间淘汰，保留90%的容量"""
+        count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        keep = int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM entries WHERE rowid IN ("
+            "SELECT rowid FROM entries ORDER BY last_access ASC LIMIT ?)",
+            (count - keep,)
+        )
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+
+    def close(self):
+        with self._lock:
+            self._evict()
+            self._conn.close()
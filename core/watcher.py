@@ -0,0 +1,400 @@
+"""
+监视文件夹：新的PDF文件写入完成后自动提取标题并重命名
+Linux上使用inotify（通过ctypes调用，不需要额外依赖）接收文件事件，
+其他平台或inotify不可用时定时扫描目录。
+"""
+import os
+import sys
+import time
+import queue
+import select
+import struct
+import threading
+import ctypes
+import ctypes.util
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.pdf_processor import PDFTitleExtractor, has_usable_title
+from core.renamer import DirectoryNameIndex, rename_with_title
+
+# inotify 常量（见 <sys/inotify.h>）
+IN_MOVED_TO = 0x00000080
+IN_CLOSE_WRITE = 0x00000008
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+# 记住的本工具生成的文件数量上限
+MAX_PRODUCED_PATHS = 100000
+
+
+def is_watched_file(path: str) -> bool:
+    """只处理PDF文件，跳过隐藏文件和Office等程序的临时文件"""
+    name = os.path.basename(path)
+    return name.lower().endswith('.pdf') and not name.startswith(('.', '~$'))
+
+
+def iter_directory_files(directory: str, recursive: bool) -> Iterable[os.DirEntry]:
+    """遍历目录中的文件（不跟随符号链接），目录不可读时跳过"""
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        yield entry
+                    elif recursive and entry.is_dir(follow_symlinks=False):
+                        yield from iter_directory_files(entry.path, recursive)
+                except OSError:
+                    continue
+    except OSError:
+        return
+
+
+class InotifySource:
+    """基于inotify的文件事件源，只关注写入完成(IN_CLOSE_WRITE)和移入(IN_MOVED_TO)的文件"""
+
+    def __init__(self, directories: List[str], recursive: bool):
+        libc_name = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.recursive = recursive
+        self._watches: Dict[int, str] = {}  # wd -> 目录
+        for directory in directories:
+            self._add_tree(directory)
+
+    @staticmethod
+    def available() -> bool:
+        return sys.platform.startswith("linux") and ctypes.util.find_library("c") is not None
+
+    def _add_watch(self, directory: str):
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF
+        if self.recursive:
+            mask |= IN_CREATE
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"无法监视目录: {directory}")
+        self._watches[wd] = directory
+
+    def _add_tree(self, directory: str):
+        self._add_watch(directory)
+        if self.recursive:
+            for root, dirs, _ in os.walk(directory):
+                for name in dirs:
+                    self._add_watch(os.path.join(root, name))
+
+    def read(self, timeout: float) -> Tuple[List[str], bool]:
+        """
+        等待文件事件，返回(文件路径列表, 是否发生事件队列溢出)
+        溢出时部分事件已丢失，调用方需要重新扫描目录
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return [], False
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+
+        paths = []
+        overflow = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF):
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                # 递归监视新建或移入的子目录，其中已有的文件当作新文件处理
+                if self.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self._add_tree(path)
+                    except OSError:
+                        continue
+                    paths.extend(entry.path for entry in iter_directory_files(path, True))
+                continue
+            paths.append(path)
+        return paths, overflow
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingSource:
+    """定时扫描目录的文件事件源，报告新出现或大小、修改时间发生变化的文件"""
+
+    def __init__(self, directories: List[str], recursive: bool, interval: float):
+        self.directories = directories
+        self.recursive = recursive
+        self.interval = interval
+        self._snapshot: Dict[str, Tuple[int, int]] = self._scan()
+        self._last_scan = time.monotonic()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for directory in self.directories:
+            for entry in iter_directory_files(directory, self.recursive):
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def read(self, timeout: float) -> Tuple[List[str], bool]:
+        """
+        最多等待timeout秒；距上次扫描不足interval秒时不扫描目录，直接返回空列表，
+        调用方的稳定检查仍按自己的短间隔进行，网络共享目录上每interval秒只遍历一次
+        """
+        remaining = self._last_scan + self.interval - time.monotonic()
+        time.sleep(max(0.0, min(timeout, remaining)))
+        if time.monotonic() - self._last_scan < self.interval:
+            return [], False
+        snapshot = self._scan()
+        self._last_scan = time.monotonic()
+        changed = [path for path, signature in snapshot.items()
+                   if self._snapshot.get(path) != signature]
+        # 消失的文件从快照中移除，之后出现的同名文件会被当作新文件
+        self._snapshot = snapshot
+        return changed, False
+
+    def close(self):
+        pass
+
+
+class FolderWatcher:
+    """
+    监视一个或多个目录，新的PDF文件写入完成后提取标题并重命名
+    处理流程：事件源 -> 等待文件大小稳定 -> 有界工作队列 -> 工作线程（提取、重命名）
+    on_result(record)：每个文件处理完成后调用（在工作线程中，调用之间互斥），
+    record 的字段与命令行模式的JSONL输出相同
+    """
+
+    def __init__(self, extractor: PDFTitleExtractor, directories: Iterable[str],
+                 recursive: bool = False,
+                 workers: Optional[int] = None,
+                 settle_seconds: float = 2.0,
+                 poll_interval: float = 5.0,
+                 queue_size: int = 1000,
+                 use_polling: bool = False,
+                 process_existing: bool = False,
+                 dry_run: bool = False,
+                 journal=None,
+                 on_result: Optional[Callable[[Dict], None]] = None):
+        self.extractor = extractor
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.recursive = recursive
+        self.workers = max(1, workers or extractor.max_workers or os.cpu_count() or 1)
+        self.settle_seconds = settle_seconds  # 文件大小和修改时间保持不变多久后视为写入完成
+        self.poll_interval = poll_interval
+        self.use_polling = use_polling
+        self.process_existing = process_existing
+        self.dry_run = dry_run
+        self.journal = journal  # 重命名日志批次（core.journal.JournalBatch），可为None
+        self.on_result = on_result
+
+        self.work_queue: "queue.Queue[str]" = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._result_lock = threading.Lock()
+        # 等待写入完成的文件：路径 -> (大小, 修改时间, 最近一次变化的时间)
+        self._settling: Dict[str, Tuple[int, int, float]] = {}
+        # 已进入工作队列或正在处理的文件
+        self._active = set()
+        # 本工具重命名生成的文件，它们产生的事件不再处理
+        self._produced: "OrderedDict[str, None]" = OrderedDict()
+        # 监视目录的文件名索引，新到达的文件在事件处理时加入
+        self._name_index = DirectoryNameIndex()
+        self._executor = None
+        self._started_at = time.time()
+
+    # ---------- 事件处理 ----------
+
+    def _create_source(self):
+        if not self.use_polling and InotifySource.available():
+            try:
+                return InotifySource(self.directories, self.recursive)
+            except OSError as e:
+                print(f"inotify不可用，改为定时扫描: {e}", file=sys.stderr)
+        return PollingSource(self.directories, self.recursive, self.poll_interval)
+
+    def _is_produced(self, path: str) -> bool:
+        with self._lock:
+            return path in self._produced
+
+    def _remember_produced(self, path: str):
+        with self._lock:
+            self._produced[path] = None
+            self._produced.move_to_end(path)
+            while len(self._produced) > MAX_PRODUCED_PATHS:
+                self._produced.popitem(last=False)
+
+    def _forget_produced(self, path: str):
+        with self._lock:
+            self._produced.pop(path, None)
+
+    def notify(self, path: str):
+        """报告一个可能新写入的文件，开始等待其写入完成"""
+        if not is_watched_file(path) or self._is_produced(path):
+            return
+        self._name_index.add(path)
+        with self._lock:
+            if path in self._active:
+                return
+            # 文件仍在变化时重新计时
+            self._settling[path] = (-1, -1, time.monotonic())
+
+    def _rescan(self, newer_than: float):
+        """事件丢失后重新扫描目录，补上修改时间晚于newer_than的文件"""
+        for directory in self.directories:
+            for entry in iter_directory_files(directory, self.recursive):
+                try:
+                    if entry.stat(follow_symlinks=False).st_mtime >= newer_than:
+                        self.notify(entry.path)
+                except OSError:
+                    continue
+
+    def _check_settled(self) -> List[str]:
+        """返回大小和修改时间已保持不变settle_seconds秒的文件"""
+        now = time.monotonic()
+        settled = []
+        with self._lock:
+            for path, (size, mtime_ns, since) in list(self._settling.items()):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # 文件已被删除或移走
+                    del self._settling[path]
+                    continue
+                if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                    self._settling[path] = (stat.st_size, stat.st_mtime_ns, now)
+                elif stat.st_size > 0 and now - since >= self.settle_seconds:
+                    del self._settling[path]
+                    self._active.add(path)
+                    settled.append(path)
+        return settled
+
+    def _enqueue(self, path: str) -> bool:
+        """放入有界工作队列，队列满时等待（对事件源形成背压），停止时返回False"""
+        while not self.stop_event.is_set():
+            try:
+                self.work_queue.put(path, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    # ---------- 工作线程 ----------
+
+    def _worker(self):
+        while not self.stop_event.is_set():
+            try:
+                path = self.work_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                record = self.process_file(path)
+            except Exception as e:
+                # 单个文件的意外错误不能让工作线程退出
+                record = {"path": path, "candidates": [], "chosen_name": None, "elapsed": 0.0,
+                          "status": "failed", "error": f"{type(e).__name__}: {e}"}
+            finally:
+                with self._lock:
+                    self._active.discard(path)
+                self.work_queue.task_done()
+            if self.on_result is not None:
+                with self._result_lock:
+                    self.on_result(record)
+
+    def process_file(self, path: str) -> Dict:
+        """提取标题并重命名单个文件，返回处理记录"""
+        start = time.perf_counter()
+        result = next(iter(self.extractor.extract_batch([path], executor=self._executor)))
+        record = {
+            "path": path,
+            "candidates": [[text, size] for text, size in result.candidates],
+            "chosen_name": None,
+            "elapsed": 0.0,
+            "status": "success",
+        }
+        if not has_usable_title(result.candidates):
+            record["status"] = "failed"
+            record["error"] = result.candidates[0][0] if result.candidates else "无法提取标题"
+        else:
+            # 新文件名在重命名之前登记：重命名产生的事件可能在rename_with_title返回之前就被处理
+            claimed = []
+
+            def on_target(new_path: str):
+                claimed.append(new_path)
+                self._remember_produced(new_path)
+
+            try:
+                new_path = rename_with_title(self.extractor, path, result.candidates[0][0],
+                                             dry_run=self.dry_run, journal=self.journal,
+                                             name_index=self._name_index, on_target=on_target)
+                record["chosen_name"] = os.path.basename(new_path)
+                record["new_path"] = new_path
+            except OSError as e:
+                for new_path in claimed:
+                    self._forget_produced(new_path)
+                record["status"] = "failed"
+                record["error"] = str(e)
+        record["elapsed"] = round(time.perf_counter() - start, 4)
+        return record
+
+    # ---------- 运行 ----------
+
+    def run(self):
+        """开始监视，阻塞直到调用stop()"""
+        source = self._create_source()
+        # 常驻进程池：每个文件到达时无需重新启动工作进程，异常文件超时或内存超限时只终止对应的工作进程
+        self._executor = self.extractor.create_executor(self.workers)
+        threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        if self.process_existing:
+            self._rescan(0)
+
+        check_interval = min(0.5, self.settle_seconds / 2) or 0.1
+        try:
+            while not self.stop_event.is_set():
+                paths, overflow = source.read(check_interval)
+                for path in paths:
+                    self.notify(path)
+                if overflow:
+                    print("文件事件过多，部分事件丢失，重新扫描目录", file=sys.stderr)
+                    self._rescan(self._started_at)
+                for path in self._check_settled():
+                    if not self._enqueue(path):
+                        break
+        finally:
+            self.stop_event.set()
+            source.close()
+            # 先终止进程池：正在提取慢文件的工作线程立即得到取消的结果，不必等到超时
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            for thread in threads:
+                thread.join()
+            self._executor = None
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,114 @@
+import os
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# 定义文件状态常量
+class FileStatus:
+    PENDING = "pending"
+    SUCCESS = "success"
+    FAILED = "failed"
+
+
+class FileRecord:
+    """
+    列表中一个文件的信息，使用__slots__而不是字典保存，大量文件时显著减少内存占用
+    size、mtime 为文件大小和修改时间（列表显示和排序用）
+    candidates 为已提取的标题候选（可选），candidates_mtime 为提取时文件的修改时间（纳秒）
+    """
+    __slots__ = ("path", "status", "error", "size", "mtime", "candidates", "candidates_mtime")
+
+    def __init__(self, path: str, size: int, mtime: float, status: str = FileStatus.PENDING):
+        self.path = path
+        self.status = sys.intern(status)
+        self.error = ""
+        self.size = size
+        self.mtime = mtime
+        self.candidates: Optional[List[Tuple[str, float]]] = None
+        self.candidates_mtime = 0
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.path)
+
+
+class FileStore:
+    """
+    文件信息存储：以绝对路径为键，不同子文件夹中的同名文件互不冲突
+    状态和错误信息使用驻留字符串，大量文件共用同一个字符串对象；
+    各状态的文件数在状态变化时增量维护，刷新状态栏无需遍历全部文件
+    """
+
+    def __init__(self):
+        self._records: Dict[str, FileRecord] = {}
+        self.status_counts: Dict[str, int] = {
+            FileStatus.PENDING: 0, FileStatus.SUCCESS: 0, FileStatus.FAILED: 0}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._records
+
+    def __getitem__(self, path: str) -> FileRecord:
+        return self._records[path]
+
+    def __iter__(self) -> Iterator[FileRecord]:
+        return iter(self._records.values())
+
+    def get(self, path: str) -> Optional[FileRecord]:
+        return self._records.get(path)
+
+    def add(self, path: str, size: int, mtime: float) -> Optional[FileRecord]:
+        """添加待处理的文件，文件已在存储中时返回None"""
+        if path in self._records:
+            return None
+        record = FileRecord(path, size, mtime)
+        self._records[path] = record
+        self.status_counts[record.status] += 1
+        return record
+
+    def remove(self, path: str) -> Optional[FileRecord]:
+        record = self._records.pop(path, None)
+        if record is not None:
+            self.status_counts[record.status] -= 1
+        return record
+
+    def clear(self):
+        self._records.clear()
+        for status in self.status_counts:
+            self.status_counts[status] = 0
+
+    def set_status(self, path: str, status: str, error: str = "") -> bool:
+        """更新文件状态，文件不在存储中时返回False"""
+        record = self._records.get(path)
+        if record is None:
+            return False
+        self.status_counts[record.status] -= 1
+        self.status_counts[status] += 1
+        record.status = sys.intern(status)
+        # 同一批处理中的失败原因大多相同（如超时、无法提取标题），驻留后只保存一份
+        record.error = sys.intern(error) if error else ""
+        return True
+
+    def rename(self, path: str, new_path: str, status: str = FileStatus.SUCCESS) -> Optional[FileRecord]:
+        """
+        文件被重命名：记录移到新路径下，清除已提取的候选和错误信息
+        新路径上原有的记录（被覆盖的文件）被移除；原路径不在存储中时返回None
+        """
+        record = self._records.pop(path, None)
+        if record is None:
+            return None
+        self.status_counts[record.status] -= 1
+        if new_path != path:
+            self.remove(new_path)
+        record.path = new_path
+        record.status = sys.intern(status)
+        record.error = ""
+        record.candidates = None
+        self._records[new_path] = record
+        self.status_counts[record.status] += 1
+        return record
+
+    def paths_with_status(self, status: str) -> List[str]:
+        return [record.path for record in self._records.values() if record.status == status]
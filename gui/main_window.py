@@ -8,6 +8,9 @@ import subprocess
 import platform
 import threading
 import queue
+import sqlite3
+import json
+import time
 
 # 尝试导入windnd库（仅Windows平台）
 DRAG_DROP_AVAILABLE = False
@@ -19,23 +22,65 @@ if platform.system() == "Windows":
         DRAG_DROP_AVAILABLE = False
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from core.pdf_processor import PDFTitleExtractor
+from core.pdf_processor import ExtractionResult, PDFTitleExtractor, is_extraction_error, preload_parsing_stack
+from core.metrics import BatchMetrics, MetricsWriter, SOURCE_CACHE
+from core.title_cache import TitleCache, default_cache_dir
+from core.renamer import DirectoryNameIndex, rename_with_title
+from core.journal import RenameJournal
+from gui.virtual_list import VirtualFileList
+from gui.file_store import FileRecord, FileStatus, FileStore
 
-# 定义文件状态常量
-class FileStatus:
-    PENDING = "pending"
-    SUCCESS = "success"
-    FAILED = "failed"
+# 批量处理时后台线程发给主线程的事件类型
+class BatchEvent:
+    RENAMED = "renamed"  # (RENAMED, 文件路径, 新路径)
+    FAILED = "failed"    # (FAILED, 文件路径, 错误信息)
+    DONE = "done"        # (DONE, None, None) 后台线程结束
+
+# 批量处理进度的刷新间隔（毫秒），约30帧/秒
+PROGRESS_FRAME_MS = 33
+# 每帧最多处理的事件数，避免大量事件堆积时界面卡顿
+MAX_EVENTS_PER_FRAME = 2000
+# 批量处理统计面板的刷新间隔（秒）和指标文件的写入间隔（秒）
+METRICS_PANEL_INTERVAL = 0.5
+METRICS_WRITE_INTERVAL = 5.0
+
+# 状态筛选选项：显示文本 -> 文件状态（None表示不筛选）
+STATUS_FILTERS = {
+    "全部": None,
+    "待处理": FileStatus.PENDING,
+    "成功": FileStatus.SUCCESS,
+    "失败": FileStatus.FAILED,
+}
+
+# 设置该环境变量后，每次启动的首次绘制和首次提取耗时追加写入缓存目录下的startup_timing.jsonl
+STARTUP_TIMING_ENV = "PDF_TITLE_EXTRACTOR_TIMING"
 
 class MainWindow:
-    def __init__(self):
+    def __init__(self, start_time: float = None, initial_paths: List[str] = None):
+        # 启动耗时的计时起点（time.perf_counter），默认为创建窗口的时间
+        self.start_time = start_time if start_time is not None else time.perf_counter()
+        # 启动时导入的文件或文件夹（拖放到程序图标上或通过"打开方式"传入）
+        self.initial_paths = list(initial_paths or [])
+        self.startup_timings: Dict[str, float] = {}
         self.root = tk.Tk()
         self.root.title("PDF文件标题提取器")
         self.root.geometry("1000x700")
         
         self.pdf_processor = PDFTitleExtractor()
-        # 存储文件信息的字典
-        self.file_info = {}  # {filename: {"path": str, "status": FileStatus, "error": str}}
+        # 启用标题候选磁盘缓存，重复选择或重启后无需重新解析
+        try:
+            self.pdf_processor.cache = TitleCache()
+        except (OSError, sqlite3.Error):
+            self.pdf_processor.cache = None
+        # 共享目录中常有同一PDF的多个副本，内容相同的文件只提取一次
+        self.pdf_processor.detect_duplicates = True
+        # 重命名日志：记录每次重命名，可撤销整批操作
+        try:
+            self.journal = RenameJournal()
+        except OSError:
+            self.journal = None
+        # 文件信息存储，以绝对路径为键（列表中的每一行也以绝对路径标识），同时维护各状态的文件数
+        self.files = FileStore()
         
         self.setup_ui()
         self.setup_bindings()
@@ -86,38 +131,57 @@ class MainWindow:
         self.batch_button.pack(side=tk.LEFT, padx=2)
         self.stop_button = ttk.Button(self.toolbar, text="停止", command=self.stop_batch_process, state=tk.DISABLED)
         self.stop_button.pack(side=tk.LEFT, padx=2)
+        self.undo_button = ttk.Button(self.toolbar, text="撤销上次批量", command=self.undo_last_batch)
+        self.undo_button.pack(side=tk.LEFT, padx=2)
+        if self.journal is None:
+            self.undo_button.config(state=tk.DISABLED)
         
     def create_file_list_panel(self):
         """创建文件列表面板"""
         self.file_list_frame = ttk.LabelFrame(self.paned, text="文件列表")
         self.paned.add(self.file_list_frame, weight=1)
         
-        # 创建Treeview替代Listbox
+        # 状态筛选
+        filter_frame = ttk.Frame(self.file_list_frame)
+        filter_frame.pack(side=tk.TOP, fill=tk.X, padx=5, pady=(5, 0))
+        ttk.Label(filter_frame, text="状态筛选:").pack(side=tk.LEFT)
+        self.status_filter_var = tk.StringVar(value="全部")
+        status_filter = ttk.Combobox(
+            filter_frame,
+            textvariable=self.status_filter_var,
+            values=list(STATUS_FILTERS),
+            state="readonly",
+            width=8
+        )
+        status_filter.pack(side=tk.LEFT, padx=5)
+        status_filter.bind('<<ComboboxSelected>>', self.on_status_filter_changed)
+        
+        # 虚拟化列表：只为可见行创建Treeview行，数据来自files
         columns = ("文件名", "状态", "大小", "修改时间")
-        self.file_tree = ttk.Treeview(self.file_list_frame, columns=columns, show="headings")
+        self.file_list = VirtualFileList(
+            self.file_list_frame,
+            columns,
+            get_values=self.get_row_values,
+            sort_keys={
+                "文件名": lambda key: os.path.basename(key).lower(),
+                "状态": lambda key: self.files[key].status,
+                "大小": lambda key: self.files[key].size,
+                "修改时间": lambda key: self.files[key].mtime,
+            }
+        )
         
         # 配置列
-        self.file_tree.heading("文件名", text="文件名")
-        self.file_tree.heading("状态", text="状态")
-        self.file_tree.heading("大小", text="大小")
-        self.file_tree.heading("修改时间", text="修改时间")
-        
-        self.file_tree.column("文件名", width=200)
-        self.file_tree.column("状态", width=80)
-        self.file_tree.column("大小", width=80)
-        self.file_tree.column("修改时间", width=120)
-        
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(self.file_list_frame, orient=tk.VERTICAL, command=self.file_tree.yview)
-        self.file_tree.configure(yscrollcommand=scrollbar.set)
+        self.file_list.tree.column("文件名", width=200)
+        self.file_list.tree.column("状态", width=80)
+        self.file_list.tree.column("大小", width=80)
+        self.file_list.tree.column("修改时间", width=120)
         
         # 布局
-        self.file_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.file_list.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
         
         # 配置拖放功能（Windows平台）
         if DRAG_DROP_AVAILABLE:
-            windnd.hook_dropfiles(self.file_tree, func=self.handle_drop_files)
+            windnd.hook_dropfiles(self.file_list.tree, func=self.handle_drop_files)
             # 添加支持拖放的提示
             ttk.Label(self.file_list_frame, text="支持拖放文件或文件夹到此处").pack(side=tk.BOTTOM, pady=5)
         else:
@@ -170,6 +234,12 @@ class MainWindow:
         )
         self.progress_bar.pack(side=tk.TOP, fill=tk.X, padx=5, pady=2)
         
+        # 批量处理统计：速度、耗时分布、队列、工作进程利用率和失败原因
+        self.metrics_frame = ttk.LabelFrame(self.status_bar, text="批量处理统计")
+        self.metrics_frame.pack(side=tk.TOP, fill=tk.X, padx=5, pady=2)
+        self.metrics_label = ttk.Label(self.metrics_frame, text="尚未进行批量处理", justify=tk.LEFT)
+        self.metrics_label.pack(side=tk.LEFT, padx=5, pady=2)
+        
         # 状态信息
         self.status_label = ttk.Label(self.status_bar, text="就绪")
         self.status_label.pack(side=tk.LEFT, padx=5)
@@ -177,9 +247,18 @@ class MainWindow:
         self.file_count_label = ttk.Label(self.status_bar, text="文件数: 0")
         self.file_count_label.pack(side=tk.RIGHT, padx=5)
         
-        # 处理队列和标志
-        self.process_queue = queue.Queue()
+        # 批量处理：后台线程通过事件队列报告结果，主线程定时取出并更新界面
+        self.batch_events = queue.Queue()
+        self.cancel_event = threading.Event()
         self.is_processing = False
+        self.processed_count = 0
+        self.batch_total = 0
+        # 当前（或上一次）批量处理的指标，指标文件写入应用数据目录
+        self.batch_metrics = None
+        self.metrics_writer = None
+        # 批量处理正在使用的进程池（由后台线程创建），停止处理时用于立即终止工作进程
+        self.batch_executor = None
+        self.metrics_panel_updated = 0.0
         
     def create_context_menu(self):
         """创建右键菜单"""
@@ -192,24 +271,21 @@ class MainWindow:
         
     def setup_bindings(self):
         """设置快捷键和事件绑定"""
-        self.file_tree.bind('<<TreeviewSelect>>', self.on_select_file)
-        self.file_tree.bind('<Button-3>', self.show_context_menu)
+        self.file_list.bind('<<ListSelect>>', self.on_select_file)
+        self.file_list.tree.bind('<Button-3>', self.show_context_menu, add=True)
         self.root.bind('<Delete>', lambda e: self.remove_selected())
         self.root.bind('<Control-a>', self.select_all)
         
     def show_context_menu(self, event):
         """显示右键菜单"""
-        if self.file_tree.selection():
+        if self.file_list.selection():
             self.context_menu.post(event.x_root, event.y_root)
             
     def show_in_explorer(self):
         """在资源管理器中显示选中的文件"""
-        selection = self.file_tree.selection()
-        if not selection:
+        file_path = self.file_list.focused()
+        if file_path is None:
             return
-            
-        filename = self.file_tree.item(selection[0])['values'][0]
-        file_path = self.file_info[filename]['path']
         
         if platform.system() == "Windows":
             subprocess.run(['explorer', '/select,', file_path])
@@ -218,66 +294,45 @@ class MainWindow:
             
     def copy_filename(self):
         """复制选中的文件名到剪贴板"""
-        selection = self.file_tree.selection()
-        if not selection:
+        file_path = self.file_list.focused()
+        if file_path is None:
             return
             
-        filename = self.file_tree.item(selection[0])['values'][0]
         self.root.clipboard_clear()
-        self.root.clipboard_append(filename)
+        self.root.clipboard_append(os.path.basename(file_path))
         
     def select_all(self, event=None):
         """选择所有文件"""
-        for item in self.file_tree.get_children():
-            self.file_tree.selection_add(item)
+        self.file_list.select_all()
             
     def clear_list(self):
         """清空文件列表"""
         if messagebox.askyesno("确认", "确定要清空文件列表吗？"):
-            self.file_tree.delete(*self.file_tree.get_children())
-            self.file_info.clear()
+            self.file_list.clear()
+            self.files.clear()
             self.update_status()
             
     def remove_processed(self):
         """移除已处理的文件"""
-        for item in self.file_tree.get_children():
-            values = self.file_tree.item(item)['values']
-            if values[1] == FileStatus.SUCCESS:
-                self.file_tree.delete(item)
-                filename = values[0]
-                if filename in self.file_info:
-                    del self.file_info[filename]
+        self.forget_files(self.files.paths_with_status(FileStatus.SUCCESS))
         self.update_status()
         
     def remove_selected(self):
         """移除选中的文件"""
-        selection = self.file_tree.selection()
-        for item in selection:
-            values = self.file_tree.item(item)['values']
-            filename = values[0]
-            self.file_tree.delete(item)
-            if filename in self.file_info:
-                del self.file_info[filename]
+        self.forget_files(self.file_list.selection())
         self.update_status()
         
     def reset_status(self):
         """重置选中文件的状态"""
-        selection = self.file_tree.selection()
-        for item in selection:
-            values = self.file_tree.item(item)['values']
-            filename = values[0]
-            if filename in self.file_info:
-                self.file_info[filename]['status'] = FileStatus.PENDING
-                self.file_info[filename]['error'] = ""
-                self.file_tree.set(item, "状态", FileStatus.PENDING)
+        for file_path in self.file_list.selection():
+            self.set_file_status(file_path, FileStatus.PENDING)
+        self.update_status()
         
     def update_status(self):
         """更新状态栏信息"""
-        total = len(self.file_tree.get_children())
-        success = sum(1 for item in self.file_tree.get_children() 
-                     if self.file_tree.item(item)['values'][1] == FileStatus.SUCCESS)
-        failed = sum(1 for item in self.file_tree.get_children() 
-                    if self.file_tree.item(item)['values'][1] == FileStatus.FAILED)
+        total = len(self.files)
+        success = self.files.status_counts[FileStatus.SUCCESS]
+        failed = self.files.status_counts[FileStatus.FAILED]
         
         self.file_count_label.config(
             text=f"总计: {total} | 成功: {success} | 失败: {failed}"
@@ -291,76 +346,156 @@ class MainWindow:
             size_in_bytes /= 1024
         return f"{size_in_bytes:.1f}GB"
         
-    def add_file_to_list(self, file_path: str):
-        """添加文件到列表，避免重复"""
-        file_path = os.path.abspath(file_path)
-        filename = os.path.basename(file_path)
+    def get_pending_files(self) -> List[str]:
+        """返回所有未成功处理的文件路径（按添加顺序，不受列表筛选影响）"""
+        return [record.path for record in self.files if record.status != FileStatus.SUCCESS]
         
-        # 检查文件是否已在列表中
-        for item in self.file_tree.get_children():
-            if self.file_tree.item(item)['values'][0] == filename:
-                return
+    def on_status_filter_changed(self, event=None):
+        """按状态筛选文件列表"""
+        status = STATUS_FILTERS[self.status_filter_var.get()]
+        if status is None:
+            self.file_list.set_filter(None)
+        else:
+            self.file_list.set_filter(lambda key: self.files[key].status == status)
+            
+    def get_row_values(self, file_path: str) -> tuple:
+        """列表中一行的显示内容，只在该行可见时生成"""
+        record = self.files[file_path]
+        return (
+            os.path.basename(file_path),
+            record.status,
+            self.get_file_size_str(record.size),
+            datetime.fromtimestamp(record.mtime).strftime('%Y-%m-%d %H:%M')
+        )
+        
+    def set_file_status(self, file_path: str, status: str, error: str = ""):
+        """更新文件状态（状态计数由文件信息存储维护）"""
+        if self.files.set_status(file_path, status, error):
+            self.file_list.update_key(file_path)
+        
+    def record_renamed(self, file_path: str, new_path: str, status: str = FileStatus.SUCCESS):
+        """
+        文件重命名后，更新文件信息、状态计数和列表显示
+        status：重命名后的文件状态（撤销重命名时为待处理）
+        """
+        # 覆盖了列表中另一个文件时，被覆盖文件的记录随之移除
+        if self.files.rename(file_path, new_path, status) is None:
+            return
+        # 列表中的行随路径更新，保持原有位置和选中状态
+        self.file_list.rename(file_path, new_path)
+        
+    def forget_files(self, file_paths):
+        """从列表和文件信息中移除文件"""
+        file_paths = list(file_paths)
+        for file_path in file_paths:
+            self.files.remove(file_path)
+        self.file_list.remove(file_paths)
+        
+    def store_candidates(self, file_path: str, candidates: List[Tuple[str, float]]):
+        """保存已提取的标题候选，供后续预览和批量处理复用（出错的结果不保存）"""
+        record = self.files.get(file_path)
+        if record is None or is_extraction_error(candidates):
+            return
+        try:
+            record.candidates_mtime = os.stat(file_path).st_mtime_ns
+            record.candidates = candidates
+        except OSError:
+            record.candidates = None
+            
+    def get_stored_candidates(self, record: FileRecord):
+        """获取保存的标题候选，文件在提取后被修改过则返回None"""
+        if record.candidates is None:
+            return None
+        try:
+            if os.stat(record.path).st_mtime_ns != record.candidates_mtime:
+                return None
+        except OSError:
+            return None
+        return record.candidates
+        
+    def register_file(self, file_path: str, skip_paths=None):
+        """
+        保存文件信息，返回文件的绝对路径；文件已在列表中或在skip_paths中时返回None
+        只更新数据，列表的显示由调用方统一刷新
+        """
+        file_path = os.path.abspath(file_path)
+        if file_path in self.files or (skip_paths and file_path in skip_paths):
+            return None
                 
-        # 获取文件信息
+        # 获取文件信息（显示文本在该行可见时才生成）
         file_stat = os.stat(file_path)
-        size_str = self.get_file_size_str(file_stat.st_size)
-        mod_time = datetime.fromtimestamp(file_stat.st_mtime).strftime('%Y-%m-%d %H:%M')
-        
-        # 添加到树形列表
-        self.file_tree.insert('', 'end', values=(
-            filename,
-            FileStatus.PENDING,
-            size_str,
-            mod_time
-        ))
-        
-        # 保存文件信息
-        self.file_info[filename] = {
-            "path": file_path,
-            "status": FileStatus.PENDING,
-            "error": ""
-        }
+        self.files.add(file_path, file_stat.st_size, file_stat.st_mtime)
+        return file_path
         
+    def add_file_to_list(self, file_path: str, refresh_status: bool = True):
+        """添加文件到列表，避免重复"""
+        added = self.register_file(file_path)
+        if added is not None:
+            self.file_list.insert(added)
+        if refresh_status:
+            self.update_status()
+            
+    def add_files(self, file_paths):
+        """
+        批量添加文件：每批文件一次性加入列表，状态栏按批刷新
+        中断的批次（日志中没有结束记录）已重命名生成的文件被跳过，避免重新导入时再次重命名
+        """
+        renamed = self.journal.interrupted_outputs() if self.journal is not None else set()
+        skipped = 0
+        batch = []
+        for file_path in file_paths:
+            added = self.register_file(file_path, renamed)
+            if added is not None:
+                batch.append(added)
+            elif renamed and os.path.abspath(file_path) in renamed:
+                skipped += 1
+            if len(batch) >= 500:
+                self.file_list.insert_many(batch)
+                batch = []
+                self.update_status()
+                self.root.update_idletasks()
+        self.file_list.insert_many(batch)
         self.update_status()
+        if skipped:
+            self.status_label.config(text=f"已跳过 {skipped} 个在中断的批量处理中已重命名的文件")
+        
+    def iter_pdf_paths(self, paths):
+        """遍历文件和文件夹，返回其中的PDF文件路径"""
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, files in os.walk(path):
+                    for file in files:
+                        if file.lower().endswith('.pdf'):
+                            yield os.path.join(root, file)
+            elif path.lower().endswith('.pdf'):
+                yield path
         
     def handle_drop_files(self, file_paths):
         """处理拖放文件 - 支持windnd库"""
-        for file_path in file_paths:
-            # windnd返回的是字节字符串，需要解码
-            if isinstance(file_path, bytes):
-                file_path = file_path.decode('gbk')  # Windows中文环境通常使用GBK编码
-                
-            if os.path.isdir(file_path):
-                # 如果是文件夹，添加其中的所有PDF文件
-                for root, _, files in os.walk(file_path):
-                    for file in files:
-                        if file.lower().endswith('.pdf'):
-                            full_path = os.path.join(root, file)
-                            self.add_file_to_list(full_path)
-            elif file_path.lower().endswith('.pdf'):
-                # 如果是PDF文件，直接添加
-                self.add_file_to_list(file_path)
+        # windnd返回的是字节字符串，需要解码（Windows中文环境通常使用GBK编码）
+        paths = [
+            file_path.decode('gbk') if isinstance(file_path, bytes) else file_path
+            for file_path in file_paths
+        ]
+        # 文件夹中的所有PDF文件和直接拖入的PDF文件一并批量添加
+        self.add_files(self.iter_pdf_paths(paths))
         
     def on_select_file(self, event):
         """处理文件选择事件"""
-        selection = self.file_tree.selection()
-        if not selection:
+        file_path = self.file_list.focused()
+        if file_path is None:
             return
             
         # 获取选中的文件信息
-        item = selection[0]
-        values = self.file_tree.item(item)['values']
-        filename = values[0]
-        file_info = self.file_info.get(filename)
+        record = self.files.get(file_path)
         
-        if not file_info:
+        if record is None:
             return
             
         # 更新文件信息显示
-        file_path = file_info['path']
         file_stat = os.stat(file_path)
         
-        info_text = f"文件名: {filename}\n"
+        info_text = f"文件名: {os.path.basename(file_path)}\n"
         info_text += f"路径: {file_path}\n"
         info_text += f"大小: {self.get_file_size_str(file_stat.st_size)}\n"
         info_text += f"修改时间: {datetime.fromtimestamp(file_stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')}"
@@ -373,8 +508,12 @@ class MainWindow:
             radio.destroy()
         self.title_radios.clear()
         
-        # 获取标题候选列表
-        candidates = self.pdf_processor.extract_title_candidates(file_path)
+        # 获取标题候选列表（优先使用已提取过的结果）
+        candidates = self.get_stored_candidates(record)
+        if candidates is None:
+            candidates = self.pdf_processor.extract_title_candidates(file_path)
+            self.store_candidates(file_path, candidates)
+            self.mark_startup("first_extraction")
         
         # 创建新的单选按钮
         for i, (title, size) in enumerate(candidates):
@@ -394,17 +533,13 @@ class MainWindow:
             
     def rename_selected_file(self):
         """重命名选中的文件"""
-        selection = self.file_tree.selection()
-        if not selection:
+        file_path = self.file_list.focused()
+        if file_path is None:
             messagebox.showwarning("警告", "请先选择一个文件")
             return
             
-        item = selection[0]
-        values = self.file_tree.item(item)['values']
-        filename = values[0]
-        file_info = self.file_info.get(filename)
-        
-        if not file_info:
+        filename = os.path.basename(file_path)
+        if file_path not in self.files:
             messagebox.showerror("错误", f"找不到文件 {filename} 的信息")
             return
             
@@ -417,7 +552,7 @@ class MainWindow:
             
         try:
             new_filename = self.pdf_processor.process_filename(title, filename)
-            new_path = os.path.join(os.path.dirname(file_info['path']), new_filename)
+            new_path = os.path.join(os.path.dirname(file_path), new_filename)
             
             # 检查目标文件是否已存在
             if os.path.exists(new_path):
@@ -425,27 +560,23 @@ class MainWindow:
                     f"文件 {new_filename} 已存在，是否覆盖？"):
                     return
                     
-            os.rename(file_info['path'], new_path)
-            
-            # 更新文件信息
-            self.file_info[new_filename] = {
-                "path": new_path,
-                "status": FileStatus.SUCCESS,
-                "error": ""
-            }
-            del self.file_info[filename]
+            if self.journal is not None:
+                batch = self.journal.begin_batch("单个文件")
+                try:
+                    batch.rename(file_path, new_path)
+                finally:
+                    batch.end()
+            else:
+                os.rename(file_path, new_path)
             
-            # 更新树形列表
-            self.file_tree.set(item, "文件名", new_filename)
-            self.file_tree.set(item, "状态", FileStatus.SUCCESS)
+            # 更新文件信息和树形列表
+            self.record_renamed(file_path, new_path)
             
             self.update_status()
             messagebox.showinfo("成功", f"文件已重命名为:\n{new_filename}")
             
         except Exception as e:
-            self.file_info[filename]['status'] = FileStatus.FAILED
-            self.file_info[filename]['error'] = str(e)
-            self.file_tree.set(item, "状态", FileStatus.FAILED)
+            self.set_file_status(file_path, FileStatus.FAILED, str(e))
             self.update_status()
             messagebox.showerror("错误", f"重命名失败: {str(e)}")
             
@@ -453,26 +584,20 @@ class MainWindow:
         """选择文件"""
         filetypes = (("PDF files", "*.pdf"), ("All files", "*.*"))
         files = filedialog.askopenfilenames(filetypes=filetypes)
-        for file in files:
-            self.add_file_to_list(file)
+        self.add_files(files)
             
     def select_directory(self):
         """选择文件夹"""
         directory = filedialog.askdirectory()
         if directory:
-            for root, _, files in os.walk(directory):
-                for file in files:
-                    if file.lower().endswith('.pdf'):
-                        full_path = os.path.join(root, file)
-                        self.add_file_to_list(full_path)
+            self.add_files(self.iter_pdf_paths([directory]))
                         
     def update_preview(self):
         """更新预览"""
-        selection = self.file_tree.selection()
-        if not selection:
+        file_path = self.file_list.focused()
+        if file_path is None:
             return
             
-        filename = self.file_tree.item(selection[0])['values'][0]
         title = self.title_var.get()
         
         # 如果自定义标题不为空，使用自定义标题
@@ -480,15 +605,24 @@ class MainWindow:
         if custom_title:
             title = custom_title
             
-        new_filename = self.pdf_processor.process_filename(title, filename)
+        new_filename = self.pdf_processor.process_filename(title, os.path.basename(file_path))
         self.preview_label.config(text=new_filename)
         
     def preview_batch_rename(self):
-        """批量预览重命名结果"""
+        """批量预览重命名结果：窗口立即打开，标题在后台提取，结果逐行显示"""
         preview_window = tk.Toplevel(self.root)
         preview_window.title("批量重命名预览")
         preview_window.geometry("800x600")
         
+        # 底部：进度和按钮
+        bottom_frame = ttk.Frame(preview_window)
+        bottom_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+        
+        progress_var = tk.DoubleVar()
+        ttk.Progressbar(bottom_frame, mode='determinate', variable=progress_var).pack(fill=tk.X, pady=(0, 5))
+        progress_label = ttk.Label(bottom_frame, text="正在提取标题...")
+        progress_label.pack(side=tk.LEFT)
+        
         # 创建预览列表
         columns = ("原文件名", "新文件名")
         preview_tree = ttk.Treeview(preview_window, columns=columns, show="headings")
@@ -501,36 +635,82 @@ class MainWindow:
         scrollbar = ttk.Scrollbar(preview_window, orient=tk.VERTICAL, command=preview_tree.yview)
         preview_tree.configure(yscrollcommand=scrollbar.set)
         
-        # 获取待处理的文件
-        pending_items = [
-            item for item in self.file_tree.get_children()
-            if self.file_tree.item(item)['values'][1] != FileStatus.SUCCESS
-        ]
-        
-        # 生成预览数据
-        for item in pending_items:
-            filename = self.file_tree.item(item)['values'][0]
-            file_path = self.file_info[filename]['path']
-            
-            # 提取标题
-            title_candidates = self.pdf_processor.extract_title_candidates(file_path)
-            if title_candidates:
-                title = title_candidates[0][0]
-                new_filename = self.pdf_processor.process_filename(title, filename)
-                preview_tree.insert("", tk.END, values=(filename, new_filename))
-        
         # 布局
         preview_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # 添加按钮
-        button_frame = ttk.Frame(preview_window)
-        button_frame.pack(fill=tk.X, padx=5, pady=5)
+        # 获取待处理的文件（在主线程中读取，后台线程只接触文件路径）
+        pending_files = self.get_pending_files()
+        total = len(pending_files)
+        
+        results_queue = queue.Queue()
+        cancel_event = threading.Event()
         
-        ttk.Button(button_frame, text="确认重命名", 
-                   command=lambda: self.start_batch_process(preview_window)).pack(side=tk.RIGHT, padx=5)
-        ttk.Button(button_frame, text="取消", 
-                   command=preview_window.destroy).pack(side=tk.RIGHT)
+        def cancel_preview():
+            cancel_event.set()
+            stop_button.config(state=tk.DISABLED)
+            
+        def close_preview():
+            cancel_event.set()
+            preview_window.destroy()
+            
+        def confirm_rename():
+            cancel_event.set()
+            self.start_batch_process(preview_window)
+            
+        ttk.Button(bottom_frame, text="确认重命名", command=confirm_rename).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(bottom_frame, text="取消", command=close_preview).pack(side=tk.RIGHT)
+        stop_button = ttk.Button(bottom_frame, text="停止预览", command=cancel_preview)
+        stop_button.pack(side=tk.RIGHT, padx=5)
+        preview_window.protocol("WM_DELETE_WINDOW", close_preview)
+        
+        def extract_thread():
+            results = self.pdf_processor.extract_batch(pending_files)
+            try:
+                for result in results:
+                    if cancel_event.is_set():
+                        break
+                    results_queue.put(result)
+            finally:
+                results.close()
+                results_queue.put(None)  # 结束标记
+        
+        def drain_results():
+            """在主线程中定时取出结果并插入预览列表"""
+            if not preview_window.winfo_exists():
+                return
+            done = False
+            titles = []  # (标题, 原文件名)，本批结果的新文件名一次生成
+            try:
+                # 每次最多处理一批结果，保持界面响应
+                for _ in range(200):
+                    result = results_queue.get_nowait()
+                    if result is None:
+                        done = True
+                        break
+                    self.store_candidates(result.path, result.candidates)
+                    self.mark_startup("first_extraction")
+                    if result.candidates:
+                        titles.append((result.candidates[0][0], os.path.basename(result.path)))
+            except queue.Empty:
+                pass
+
+            new_filenames = self.pdf_processor.process_filenames(titles)
+            for (_, filename), new_filename in zip(titles, new_filenames):
+                preview_tree.insert("", tk.END, values=(filename, new_filename))
+
+            count = len(preview_tree.get_children())
+            progress_var.set(count / total * 100 if total else 100)
+            if done:
+                state = "已停止" if cancel_event.is_set() else "完成"
+                progress_label.config(text=f"{state}: {count}/{total}")
+                stop_button.config(state=tk.DISABLED)
+            else:
+                progress_label.config(text=f"正在提取标题: {count}/{total}")
+                preview_window.after(50, drain_results)
+        
+        threading.Thread(target=extract_thread, daemon=True).start()
+        preview_window.after(50, drain_results)
     
     def start_batch_process(self, preview_window=None):
         """开始批量处理"""
@@ -538,116 +718,289 @@ class MainWindow:
             return
             
         # 获取待处理的文件
-        pending_items = [
-            item for item in self.file_tree.get_children()
-            if self.file_tree.item(item)['values'][1] != FileStatus.SUCCESS
-        ]
+        pending_files = self.get_pending_files()
         
-        if not pending_items:
+        if not pending_files:
             messagebox.showinfo("提示", "没有待处理的文件")
             return
             
         if preview_window:
             preview_window.destroy()
         else:
-            if not messagebox.askyesno("确认", f"是否要处理 {len(pending_items)} 个文件？"):
+            if not messagebox.askyesno("确认", f"是否要处理 {len(pending_files)} 个文件？"):
                 return
             
+        # 在主线程中准备任务 (路径, 已保存的候选)，后台线程不访问files
+        tasks = [(file_path, self.get_stored_candidates(self.files[file_path]))
+                 for file_path in pending_files]
+            
         # 更新UI状态
         self.is_processing = True
         self.batch_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
         self.progress_var.set(0)
-        
-        # 将待处理文件加入队列
-        for item in pending_items:
-            self.process_queue.put(item)
-            
-        # 启动处理线程
-        total_files = len(pending_items)
         self.processed_count = 0
-        
-        def process_thread():
-            while not self.process_queue.empty() and self.is_processing:
-                item = self.process_queue.get()
-                self.process_single_file(item)
-                self.processed_count += 1
-                progress = (self.processed_count / total_files) * 100
-                self.progress_var.set(progress)
-                self.status_label.config(text=f"正在处理: {self.processed_count}/{total_files}")
-                self.root.update()
-                
-            # 处理完成或被中止
-            self.is_processing = False
-            self.batch_button.config(state=tk.NORMAL)
-            self.stop_button.config(state=tk.DISABLED)
-            
-            if not self.process_queue.empty():
-                self.status_label.config(text="处理已中止")
+        self.batch_total = len(tasks)
+        self.cancel_event.clear()
+        
+        # 批量提取的结果由提取器记录到指标中，重命名耗时在process_single_file中记录
+        self.batch_metrics = BatchMetrics()
+        self.pdf_processor.metrics = self.batch_metrics
+        self.metrics_writer = MetricsWriter(
+            self.batch_metrics,
+            os.path.join(default_cache_dir(), "batch_metrics.json"),
+            os.path.join(default_cache_dir(), "batch_metrics.prom"),
+            METRICS_WRITE_INTERVAL
+        ).start()
+        self.update_metrics_panel()
+        
+        # 启动处理线程，主线程定时取出处理结果
+        batch = self.journal.begin_batch("批量处理") if self.journal is not None else None
+        threading.Thread(target=self.batch_worker, args=(tasks, batch), daemon=True).start()
+        self.root.after(PROGRESS_FRAME_MS, self.pump_batch_events)
+        
+    def batch_worker(self, tasks: List[Tuple[str, List]], batch=None):
+        """
+        后台线程：提取标题并重命名文件，每个文件的结果作为事件放入队列
+        不访问任何Tk控件和files；batch为本次处理的重命名日志批次
+        """
+        # 新文件名在内存中分配，每个目录只读取一次文件列表
+        name_index = DirectoryNameIndex()
+        try:
+            # 预览或选择文件时已提取过标题的文件直接使用保存的候选，其余文件在多进程中并行提取
+            to_extract = []
+            metrics = self.batch_metrics
+            for file_path, candidates in tasks:
+                if candidates is None:
+                    to_extract.append(file_path)
+                    continue
+                if self.cancel_event.is_set():
+                    return
+                metrics.add_planned(1)
+                metrics.observe_extraction(ExtractionResult(file_path, candidates, 0.0), SOURCE_CACHE)
+                self.batch_events.put(self.process_single_file(
+                    file_path, candidates, batch, name_index))
+            
+            if to_extract and not self.cancel_event.is_set():
+                # 进程池由本线程创建，停止时主线程通过它立即终止正在处理的工作进程
+                workers = min(self.pdf_processor.max_workers or os.cpu_count() or 1, len(to_extract))
+                self.batch_executor = self.pdf_processor.create_executor(workers)
+                if self.cancel_event.is_set():
+                    return
+                results = self.pdf_processor.extract_batch(to_extract, executor=self.batch_executor)
+                try:
+                    for result in results:
+                        if self.cancel_event.is_set():
+                            break
+                        if result.error:
+                            # 超时、内存超限或工作进程崩溃的文件直接标记为失败
+                            self.batch_events.put((BatchEvent.FAILED, result.path, result.error))
+                            continue
+                        self.batch_events.put(self.process_single_file(
+                            result.path, result.candidates, batch, name_index))
+                finally:
+                    # 取消尚未开始的提取任务
+                    results.close()
+        finally:
+            if self.batch_executor is not None:
+                self.batch_executor.shutdown(wait=False, cancel_futures=True)
+                self.batch_executor = None
+            if batch is not None:
+                batch.end()
+            self.batch_events.put((BatchEvent.DONE, None, None))
+            
+    def pump_batch_events(self):
+        """主线程：取出后台线程的事件并更新文件状态，进度和状态栏每帧只刷新一次"""
+        finished = False
+        handled = 0
+        while handled < MAX_EVENTS_PER_FRAME:
+            try:
+                kind, file_path, detail = self.batch_events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == BatchEvent.DONE:
+                finished = True
+                break
+            handled += 1
+            self.processed_count += 1
+            self.mark_startup("first_extraction")
+            # 处理过程中文件可能已被移出列表
+            if file_path not in self.files:
+                continue
+            if kind == BatchEvent.RENAMED:
+                self.record_renamed(file_path, detail)
             else:
-                self.status_label.config(text="处理完成")
-                messagebox.showinfo("完成", "批量处理已完成")
+                self.set_file_status(file_path, FileStatus.FAILED, detail)
                 
-        threading.Thread(target=process_thread, daemon=True).start()
+        if handled:
+            self.progress_var.set(self.processed_count / self.batch_total * 100)
+            self.update_status()
+        if time.monotonic() - self.metrics_panel_updated >= METRICS_PANEL_INTERVAL:
+            self.update_metrics_panel()
+        if finished:
+            self.finish_batch_process()
+            return
+        if not self.cancel_event.is_set():
+            self.status_label.config(text=f"正在处理: {self.processed_count}/{self.batch_total}")
+        self.root.after(PROGRESS_FRAME_MS, self.pump_batch_events)
+        
+    def finish_batch_process(self):
+        """批量处理完成或被中止后恢复界面状态"""
+        self.is_processing = False
+        self.batch_button.config(state=tk.NORMAL)
+        self.stop_button.config(state=tk.DISABLED)
+        self.pdf_processor.metrics = None
+        if self.metrics_writer is not None:
+            self.metrics_writer.stop()
+            self.metrics_writer = None
+        self.update_metrics_panel()
+        
+        if self.processed_count < self.batch_total:
+            self.status_label.config(text=f"处理已中止: {self.processed_count}/{self.batch_total}")
+        else:
+            self.status_label.config(text="处理完成")
+            messagebox.showinfo("完成", "批量处理已完成")
         
     def stop_batch_process(self):
-        """停止批量处理"""
+        """停止批量处理：取消尚未开始的文件，并立即终止正在处理文件的工作进程"""
         if self.is_processing:
             if messagebox.askyesno("确认", "确定要停止处理吗？"):
-                self.is_processing = False
+                self.cancel_event.set()
+                self.cancel_batch_executor()
+                self.stop_button.config(state=tk.DISABLED)
+                self.status_label.config(text="正在停止...")
                 
-    def process_single_file(self, item):
-        """处理单个文件"""
-        values = self.file_tree.item(item)['values']
-        filename = values[0]
-        file_info = self.file_info.get(filename)
-        
-        if not file_info or values[1] == FileStatus.SUCCESS:
-            return
-            
+    def cancel_batch_executor(self):
+        """
+        关闭批量处理的进程池：正在处理的文件以取消结果立即返回，后台线程随即检查到停止标志；
+        进程池尚未创建时，后台线程在创建后检查停止标志，不会开始提取
+        """
+        executor = self.batch_executor
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            
+    def process_single_file(self, file_path: str, candidates=None,
+                            batch=None, name_index=None) -> Tuple[str, str, str]:
+        """
+        处理单个文件（在后台线程中运行），candidates为已提取的标题候选（为None时现场提取）
+        batch为重命名日志批次，name_index为本次批量处理的目录文件名索引（均可为None）
+        返回：(BatchEvent, 文件路径, 新路径或错误信息)
+        """
         try:
             # 获取标题
-            file_path = file_info['path']
-            candidates = self.pdf_processor.extract_title_candidates(file_path)
+            if candidates is None:
+                candidates = self.pdf_processor.extract_title_candidates(file_path)
             
             if not candidates:
                 raise Exception("无法提取标题")
                 
             title = candidates[0][0]  # 使用第一个候选标题
             
-            # 生成新文件名
-            new_filename = self.pdf_processor.process_filename(title, filename)
-            new_path = os.path.join(os.path.dirname(file_path), new_filename)
-            
-            # 检查文件是否存在
-            if os.path.exists(new_path):
-                base, ext = os.path.splitext(new_path)
-                counter = 1
-                while os.path.exists(new_path):
-                    new_path = f"{base}_{counter}{ext}"
-                    counter += 1
-                    
-            # 重命名文件
-            os.rename(file_path, new_path)
-            
-            # 更新文件信息
-            self.file_info[new_filename] = {
-                "path": new_path,
-                "status": FileStatus.SUCCESS,
-                "error": ""
-            }
-            del self.file_info[filename]
-            
-            # 更新UI
-            self.file_tree.set(item, "文件名", new_filename)
-            self.file_tree.set(item, "状态", FileStatus.SUCCESS)
+            # 生成新文件名并重命名（自动避开同名文件）
+            metrics = self.pdf_processor.metrics
+            start = time.perf_counter()
+            try:
+                new_path = rename_with_title(self.pdf_processor, file_path, title,
+                                             journal=batch, name_index=name_index)
+            except OSError as e:
+                if metrics is not None:
+                    metrics.observe_rename(time.perf_counter() - start, e)
+                raise
+            if metrics is not None:
+                metrics.observe_rename(time.perf_counter() - start)
+            return (BatchEvent.RENAMED, file_path, new_path)
             
         except Exception as e:
-            self.file_info[filename]['status'] = FileStatus.FAILED
-            self.file_info[filename]['error'] = str(e)
-            self.file_tree.set(item, "状态", FileStatus.FAILED)
+            return (BatchEvent.FAILED, file_path, str(e))
+        
+    def update_metrics_panel(self):
+        """在统计面板中显示当前批量处理的指标摘要"""
+        self.metrics_panel_updated = time.monotonic()
+        if self.batch_metrics is None:
+            return
+        snapshot = self.batch_metrics.snapshot()
+        extraction = snapshot["extraction_seconds"]
+        rename = snapshot["rename_seconds"]
+        lines = [
+            f"速度: {snapshot['files_per_sec']:.1f} 文件/秒 | 已完成: {snapshot['completed']}/{snapshot['planned']}"
+            f" | 队列: {snapshot['queue_depth']} | 工作进程: {snapshot['workers']}"
+            f"（利用率 {snapshot['worker_utilization']:.0%}）",
+            f"提取耗时: p50 {extraction['p50']:.2f}s p95 {extraction['p95']:.2f}s 最长 {extraction['max']:.2f}s"
+            f" | 重命名耗时: p50 {rename['p50'] * 1000:.1f}ms p95 {rename['p95'] * 1000:.1f}ms"
+            f" | 缓存: {snapshot['sources'].get(SOURCE_CACHE, 0)}",
+        ]
+        if snapshot["failures"]:
+            lines.append("失败原因: " + ", ".join(
+                f"{error_class} {count}" for error_class, count in
+                sorted(snapshot["failures"].items(), key=lambda item: -item[1])))
+        self.metrics_label.config(text="\n".join(lines))
+        
+    def undo_last_batch(self):
+        """按重命名日志撤销最近一批重命名，列表中的文件恢复为原文件名和待处理状态"""
+        if self.is_processing:
+            messagebox.showwarning("警告", "请等待批量处理结束后再撤销")
+            return
             
+        batch = self.journal.last_batch()
+        if batch is None:
+            messagebox.showinfo("提示", "没有可撤销的重命名")
+            return
+        if not messagebox.askyesno("确认", f"是否撤销上次批量处理中的 {len(batch.completed())} 个文件重命名？"):
+            return
+            
+        failed = []
+        for current_path, restored_path, error in self.journal.undo(batch.batch_id):
+            if error:
+                failed.append(f"{os.path.basename(current_path)}: {error}")
+                continue
+            self.record_renamed(current_path, restored_path, FileStatus.PENDING)
         self.update_status()
         
+        if failed:
+            messagebox.showerror("错误", "以下文件未能恢复:\n" + "\n".join(failed[:20]))
+        else:
+            messagebox.showinfo("完成", "已撤销上次批量重命名")
+            
+    def on_close(self):
+        """关闭窗口前将重命名日志写入磁盘"""
+        self.cancel_event.set()
+        self.cancel_batch_executor()
+        if self.journal is not None:
+            self.journal.close()
+        self.root.destroy()
+        
+    def mark_startup(self, event: str):
+        """记录启动后第一次发生某事件（first_paint、first_extraction）的耗时，只在主线程中调用"""
+        if event in self.startup_timings:
+            return
+        self.startup_timings[event] = round(time.perf_counter() - self.start_time, 3)
+        if len(self.startup_timings) == 2 and os.environ.get(STARTUP_TIMING_ENV):
+            record = dict(self.startup_timings, time=datetime.now().isoformat(timespec="seconds"),
+                          frozen=bool(getattr(sys, "frozen", False)))
+            try:
+                with open(os.path.join(default_cache_dir(), "startup_timing.jsonl"), "a",
+                          encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError:
+                pass
+            
+    def on_first_paint(self):
+        """窗口第一次绘制完成后，在后台导入PDF解析依赖，使第一次提取无需等待导入"""
+        self.mark_startup("first_paint")
+        threading.Thread(target=self.preload_parsing_stack, daemon=True).start()
+        paths = [path for path in self.initial_paths if os.path.exists(path)]
+        if paths:
+            self.add_files(self.iter_pdf_paths(paths))
+        
+    def preload_parsing_stack(self):
+        try:
+            preload_parsing_stack()
+        except ImportError:
+            # 缺少依赖时在提取文件时报告错误
+            pass
+        
     def run(self):
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        # 空闲回调在窗口完成第一次绘制之后执行
+        self.root.after_idle(self.on_first_paint)
         self.root.mainloop()
\ No newline at end of file
@@ -0,0 +1,379 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+
+class VirtualFileList(ttk.Frame):
+    """
+    虚拟化的文件列表
+    数据保存在列表模型中（以字符串键标识每一行），Treeview只保留与可见行数相同的行对象，
+    滚动时复用这些行显示对应位置的数据。排序和筛选都在模型上完成，
+    因此列表中的文件数量不受Treeview性能的限制。
+    选中状态变化时产生 <<ListSelect>> 虚拟事件。
+    """
+
+    def __init__(self, parent, columns: Sequence[str],
+                 get_values: Callable[[str], tuple],
+                 sort_keys: Optional[Dict[str, Callable[[str], object]]] = None):
+        super().__init__(parent)
+        self.columns = tuple(columns)
+        self.get_values = get_values  # 键 -> 各列显示值
+        self.sort_keys = sort_keys or {}  # 列名 -> 排序键函数
+
+        # 模型：按插入顺序保存的键（删除的位置为None，积累过多时压缩）
+        self._keys: List[Optional[str]] = []
+        self._slots: Dict[str, int] = {}  # 键 -> 在_keys中的位置
+        self._removed = 0
+        # 视图：筛选和排序后的键
+        self._view: List[str] = []
+        self._view_pos: Dict[str, int] = {}  # 键 -> 在_view中的位置
+        self._sort_values: Dict[str, object] = {}  # 重建视图时各键的排序值
+        self._view_dirty = False
+        self._rebuild_scheduled = False
+        self.filter_func: Optional[Callable[[str], bool]] = None
+        self.sort_column: Optional[str] = None
+        self.sort_reverse = False
+
+        # 选中状态
+        self._selected: Dict[str, None] = {}  # 保持选中的先后顺序
+        self._anchor: Optional[str] = None
+        self._focus: Optional[str] = None
+
+        # 显示状态
+        self._offset = 0
+        self._row_items: List[str] = []  # 复用的Treeview行
+        self._visible: Dict[str, str] = {}  # 当前显示的键 -> 行
+        self._row_height = 20
+        self._heading_height = 24
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings", selectmode="none")
+        for column in self.columns:
+            self.tree.heading(column, text=column, command=lambda c=column: self.sort_by(c))
+        self.tree.tag_configure("selected", background="#cce8ff")
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind("<Configure>", lambda e: self._render())
+        self.tree.bind("<Button-1>", self._on_click)
+        self.tree.bind("<Shift-Button-1>", lambda e: self._on_click(e, extend=True))
+        self.tree.bind("<Control-Button-1>", lambda e: self._on_click(e, toggle=True))
+        self.tree.bind("<Button-3>", self._on_right_click, add=True)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Up>", lambda e: self._move_focus(-1))
+        self.tree.bind("<Down>", lambda e: self._move_focus(1))
+        self.tree.bind("<Prior>", lambda e: self._move_focus(-self._page_size()))
+        self.tree.bind("<Next>", lambda e: self._move_focus(self._page_size()))
+
+    # ---------- 模型操作 ----------
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._slots
+
+    def keys(self) -> Iterator[str]:
+        """按插入顺序遍历所有键"""
+        return (key for key in self._keys if key is not None)
+
+    def insert_many(self, keys: Iterable[str]):
+        """批量添加行"""
+        for key in keys:
+            if key in self._slots:
+                continue
+            self._slots[key] = len(self._keys)
+            self._keys.append(key)
+        self.invalidate()
+
+    def insert(self, key: str):
+        self.insert_many((key,))
+
+    def remove(self, keys: Iterable[str]):
+        """批量删除行"""
+        for key in keys:
+            index = self._slots.pop(key, None)
+            if index is None:
+                continue
+            self._keys[index] = None
+            self._removed += 1
+            self._selected.pop(key, None)
+            if self._anchor == key:
+                self._anchor = None
+            if self._focus == key:
+                self._focus = None
+        # 删除的位置过多时压缩模型
+        if self._removed > 1000 and self._removed > len(self._keys) // 2:
+            self._keys = [key for key in self._keys if key is not None]
+            self._slots = {key: index for index, key in enumerate(self._keys)}
+            self._removed = 0
+        self.invalidate()
+
+    def rename(self, old_key: str, new_key: str):
+        """修改行的键，保持其位置和选中状态"""
+        index = self._slots.pop(old_key, None)
+        if index is None:
+            return
+        if new_key in self._slots:
+            self.remove((new_key,))
+        self._keys[index] = new_key
+        self._slots[new_key] = index
+        if old_key in self._selected:
+            # 保持选中顺序
+            self._selected = {new_key if k == old_key else k: None for k in self._selected}
+        if self._anchor == old_key:
+            self._anchor = new_key
+        if self._focus == old_key:
+            self._focus = new_key
+        self._apply_change(new_key, old_key)
+
+    def clear(self):
+        self._keys.clear()
+        self._slots.clear()
+        self._removed = 0
+        self._selected.clear()
+        self._anchor = self._focus = None
+        self._offset = 0
+        self.invalidate()
+
+    def update_key(self, key: str):
+        """某一行的数据发生变化"""
+        self._apply_change(key)
+
+    def _apply_change(self, key: str, old_key: Optional[str] = None):
+        """
+        一行的数据（或键）发生变化：筛选结果和排序列的值都没有变化时就地修改视图并重绘该行，
+        否则标记视图需要重建（同一轮事件中的多次修改合并为一次重建）
+        """
+        if self._view_dirty:
+            return
+        old_key = old_key or key
+        position = self._view_pos.get(old_key)
+        shown = self.filter_func is None or self.filter_func(key)
+        if shown != (position is not None):
+            self.invalidate()
+            return
+        if position is None:
+            return
+        if self.sort_column is not None:
+            value = self.sort_keys[self.sort_column](key)
+            if value != self._sort_values.get(old_key):
+                self.invalidate()
+                return
+            if old_key != key:
+                del self._sort_values[old_key]
+                self._sort_values[key] = value
+        if old_key != key:
+            self._view[position] = key
+            del self._view_pos[old_key]
+            self._view_pos[key] = position
+            item = self._visible.pop(old_key, None)
+            if item is not None:
+                self._visible[key] = item
+        item = self._visible.get(key)
+        if item is not None:
+            self._draw_row(item, key)
+
+    def refresh(self):
+        """重绘可见行"""
+        self._render()
+
+    # ---------- 视图：筛选和排序 ----------
+
+    def set_filter(self, filter_func: Optional[Callable[[str], bool]]):
+        self.filter_func = filter_func
+        self._offset = 0
+        self.invalidate()
+
+    def sort_by(self, column: str):
+        """按列排序，再次点击同一列时反向排序"""
+        if column not in self.sort_keys:
+            return
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = False
+        for name in self.columns:
+            text = name
+            if name == self.sort_column:
+                text += " ▼" if self.sort_reverse else " ▲"
+            self.tree.heading(name, text=text)
+        self.invalidate()
+
+    def invalidate(self):
+        """标记视图需要重建，同一轮事件中的多次修改合并为一次重建"""
+        self._view_dirty = True
+        if not self._rebuild_scheduled:
+            self._rebuild_scheduled = True
+            self.after_idle(self._rebuild_view)
+
+    def _rebuild_view(self):
+        self._rebuild_scheduled = False
+        if not self._view_dirty:
+            return
+        self._view_dirty = False
+        view = [key for key in self._keys if key is not None]
+        if self.filter_func is not None:
+            view = [key for key in view if self.filter_func(key)]
+        if self.sort_column is not None:
+            # 保存排序值，行数据变化时据此判断是否需要重新排序
+            sort_key = self.sort_keys[self.sort_column]
+            self._sort_values = {key: sort_key(key) for key in view}
+            view.sort(key=self._sort_values.__getitem__, reverse=self.sort_reverse)
+        else:
+            self._sort_values = {}
+        self._view = view
+        self._view_pos = {key: index for index, key in enumerate(view)}
+        self._render()
+
+    def view_keys(self) -> List[str]:
+        """当前显示顺序（筛选和排序后）的键"""
+        if self._view_dirty:
+            self._rebuild_view()
+        return self._view
+
+    # ---------- 选择 ----------
+
+    def selection(self) -> List[str]:
+        """选中的键，按选中的先后顺序"""
+        return list(self._selected)
+
+    def focused(self) -> Optional[str]:
+        """最近一次点击或键盘选中的键"""
+        if self._focus in self._selected:
+            return self._focus
+        return next(iter(self._selected), None)
+
+    def set_selection(self, keys: Iterable[str], focus: Optional[str] = None):
+        self._selected = {key: None for key in keys if key in self._slots}
+        self._focus = focus if focus in self._selected else next(iter(self._selected), None)
+        self._anchor = self._focus
+        self._render()
+        self.event_generate("<<ListSelect>>")
+
+    def select_all(self):
+        self.set_selection(self.view_keys(), focus=self._focus)
+
+    def _on_click(self, event, extend: bool = False, toggle: bool = False):
+        # 表头点击（排序）和列宽拖动交给Treeview默认处理
+        if self.tree.identify_region(event.x, event.y) not in ("cell", "tree", "nothing"):
+            return None
+        self.tree.focus_set()
+        key = self._key_at(event.y)
+        if key is None:
+            return "break"
+        view = self.view_keys()
+        if extend and self._anchor in self._slots and key in self._view_pos:
+            end = self._view_pos[key]
+            start, end = sorted((self._view_pos.get(self._anchor, end), end))
+            self._selected = {k: None for k in view[start:end + 1]}
+            self._focus = key
+        elif toggle:
+            if key in self._selected:
+                del self._selected[key]
+            else:
+                self._selected[key] = None
+            self._anchor = self._focus = key
+        else:
+            self._selected = {key: None}
+            self._anchor = self._focus = key
+        self._render()
+        self.event_generate("<<ListSelect>>")
+        return "break"
+
+    def _on_right_click(self, event):
+        # 右键点击未选中的行时，先选中该行
+        key = self._key_at(event.y)
+        if key is not None and key not in self._selected:
+            self.set_selection([key], focus=key)
+
+    def _move_focus(self, delta: int):
+        view = self.view_keys()
+        if not view:
+            return "break"
+        position = self._view_pos.get(self._focus)
+        index = 0 if position is None else position + delta
+        index = max(0, min(len(view) - 1, index))
+        key = view[index]
+        if index < self._offset:
+            self._offset = index
+        elif index >= self._offset + len(self._row_items):
+            self._offset = index - len(self._row_items) + 1
+        self.set_selection([key], focus=key)
+        return "break"
+
+    def _key_at(self, y: int) -> Optional[str]:
+        item = self.tree.identify_row(y)
+        for key, row in self._visible.items():
+            if row == item:
+                return key
+        return None
+
+    # ---------- 滚动与绘制 ----------
+
+    def _page_size(self) -> int:
+        return max(1, len(self._row_items) - 1)
+
+    def scroll(self, delta: int):
+        self._offset += delta
+        self._render()
+        return "break"
+
+    def _on_mousewheel(self, event):
+        # Windows的delta为120的倍数，macOS为较小的整数
+        step = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self.scroll(-step * 3)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self._offset = int(float(value) * len(self._view))
+        elif action == "scroll":
+            step = self._page_size() if unit == "pages" else 1
+            self._offset += int(value) * step
+        self._render()
+
+    def _draw_row(self, item: str, key: str):
+        tags = ("selected",) if key in self._selected else ()
+        self.tree.item(item, values=self.get_values(key), tags=tags)
+
+    def _ensure_row_pool(self):
+        """根据控件高度调整复用行的数量"""
+        if self._row_items:
+            bbox = self.tree.bbox(self._row_items[0])
+            if bbox:
+                self._heading_height = bbox[1]
+                self._row_height = max(1, bbox[3])
+        height = self.tree.winfo_height()
+        count = max(1, (height - self._heading_height) // self._row_height)
+        while len(self._row_items) < count:
+            self._row_items.append(self.tree.insert("", tk.END, values=()))
+        while len(self._row_items) > count:
+            self.tree.delete(self._row_items.pop())
+
+    def _render(self):
+        if self._view_dirty:
+            # 视图重建完成后会再次调用本方法
+            return
+        self._ensure_row_pool()
+        total = len(self._view)
+        rows = len(self._row_items)
+        self._offset = max(0, min(self._offset, total - rows))
+
+        self._visible = {}
+        for index, item in enumerate(self._row_items):
+            position = self._offset + index
+            if position < total:
+                key = self._view[position]
+                self._visible[key] = item
+                self._draw_row(item, key)
+            else:
+                self.tree.item(item, values=(), tags=())
+
+        if total:
+            self.scrollbar.set(self._offset / total, min(1.0, (self._offset + rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
@@ -1,8 +1,25 @@
-from gui.main_window import MainWindow
+import time
+
+# 启动耗时的计时起点，在其他模块导入之前记录
+START_TIME = time.perf_counter()
+
+import sys
+import multiprocessing
 
 def main():
-    app = MainWindow()
+    # 第一个参数为命令行子命令（或帮助）时进入无界面模式，不加载Tk；
+    # 其他参数（拖放到程序图标上或"打开方式"传入的文件路径）交给图形界面导入
+    args = sys.argv[1:]
+    if args:
+        from cli import COMMANDS, main as cli_main
+        if args[0] in COMMANDS or args[0] in ("-h", "--help"):
+            sys.exit(cli_main(args))
+    
+    from gui.main_window import MainWindow
+    app = MainWindow(start_time=START_TIME, initial_paths=args)
     app.run()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # 打包为可执行文件后，多进程批量提取需要此调用
+    multiprocessing.freeze_support()
+    main()
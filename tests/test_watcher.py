@@ -0,0 +1,59 @@
+"""
+监视模式的回归测试
+"""
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from benchmarks.corpus import CorpusSpec, build_pdf
+from core.journal import RenameJournal
+from core.pdf_processor import PDFTitleExtractor
+from core.watcher import FolderWatcher, InotifySource
+
+
+@unittest.skipUnless(InotifySource.available(), "需要inotify")
+class InotifyWatchTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.journal_directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        shutil.rmtree(self.journal_directory, ignore_errors=True)
+
+    def test_output_is_not_renamed_again(self):
+        """重命名产生的IN_MOVED_TO事件不能把输出文件当作新文件再次重命名"""
+        records = []
+        # 每条日志记录都fsync，重命名之后到rename_with_title返回之间有足够的时间处理事件
+        journal = RenameJournal(os.path.join(self.journal_directory, "journal.jsonl"), sync_every=1)
+        watcher = FolderWatcher(PDFTitleExtractor(), [self.directory], workers=1,
+                                settle_seconds=0.2, journal=journal.begin_batch("watch"),
+                                on_result=records.append)
+        thread = threading.Thread(target=watcher.run, daemon=True)
+        thread.start()
+        try:
+            time.sleep(0.5)
+            data, _ = build_pdf(random.Random(1), CorpusSpec(pages=(1, 1), padding_kb=(0, 0)))
+            with open(os.path.join(self.directory, "scan.pdf"), "wb") as f:
+                f.write(data)
+            deadline = time.monotonic() + 30
+            while not records and time.monotonic() < deadline:
+                time.sleep(0.1)
+            # 留出足够时间让可能的第二次重命名发生
+            time.sleep(2)
+        finally:
+            watcher.stop()
+            thread.join(10)
+            journal.close()
+
+        self.assertEqual(len(records), 1, records)
+        self.assertEqual(records[0]["status"], "success", records[0])
+        self.assertEqual(os.listdir(self.directory), [records[0]["chosen_name"]])
+
+
+if __name__ == "__main__":
+    unittest.main()